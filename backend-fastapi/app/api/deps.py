@@ -1,17 +1,54 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from app.core.config import settings
+from app.core.metrics import timed
+from app.services.cache import RedisCache
+from app.services.container import Services
+from app.services.odoo_client import OdooClient
 
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_session(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Decoded token of any signed-in caller, patient or staff."""
     token = credentials.credentials
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
+        with timed("auth"):
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
         )
+    # Every Odoo call needs the stored credential; once it is gone the token is useless
+    if not await request.app.state.services.session_store.get_user_password(payload["user_id"][0]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session ended, please log in again"
+        )
+    return payload
+
+
+async def get_current_user(session: dict = Depends(get_current_session)):
+    # Patient routes read the caller's patient record from the token; tokens issued before roles are patients
+    if session.get("role", "patient") != "patient":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Patient account required")
+    return session
+
+
+async def get_current_staff(session: dict = Depends(get_current_session)):
+    if session.get("role") != "staff":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff account required")
+    return session
+
+
+async def get_services(request: Request) -> Services:
+    return request.app.state.services
+
+
+async def get_odoo_client(request: Request) -> OdooClient:
+    return request.app.state.services.odoo
+
+
+async def get_cache(request: Request) -> RedisCache:
+    return request.app.state.services.cache
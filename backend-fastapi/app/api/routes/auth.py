@@ -1,23 +1,51 @@
-from fastapi import APIRouter
-from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException
+from app.api import deps
+import uuid
+from datetime import datetime, timedelta, timezone
 from app.services.odoo_client import OdooClient
 from app.core.security import create_access_token
 from app.core.config import settings
 from app.schemas.token import Token
-from app.schemas.user import LoginRequest
+from app.schemas.user import LoginRequest, StaffLoginRequest
 
 router = APIRouter(prefix="/auth", tags=["auth"])
-odoo_client = OdooClient()
 
 @router.post("/login", response_model=Token)
-def login(request: LoginRequest):
-    uid = odoo_client.authenticate(request.email, request.password)
+async def login(request: LoginRequest, odoo_client: OdooClient = Depends(deps.get_odoo_client)):
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    session_id = uuid.uuid4().hex
+    uid = await odoo_client.authenticate(request.email, request.password, session_id,
+                                         (datetime.now(timezone.utc) + access_token_expires).timestamp())
     if not uid:
         raise ValueError("Invalid credentials")
-    user_info = odoo_client.get_user_info(uid, request.password)
+    user_info = await odoo_client.get_user_info(uid, request.password)
     if not user_info:
         raise ValueError("User not found")
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"email": user_info["email"],"uid": user_info["id"],"name":user_info["name"],"date_of_birth":user_info["date_of_birth"],
+    access_token = create_access_token(data={"jti": session_id, "role": "patient", "email": user_info["email"],"uid": user_info["id"],"name":user_info["name"],"date_of_birth":user_info["date_of_birth"],
                                              "gender":user_info["gender"],"phone":user_info["phone"],"user_id":user_info["user_id"]},expires_delta=access_token_expires,)
     return Token(access_token=access_token)
+
+@router.post("/staff/login", response_model=Token)
+async def staff_login(request: StaffLoginRequest, odoo_client: OdooClient = Depends(deps.get_odoo_client)):
+    """Token for nurses, triage stations and bedside devices: any internal Odoo user.
+
+    Devices should sign in with a dedicated Odoo user, using one of its API
+    keys as the password. The token only opens staff routes; what the user
+    may do there is decided by its Odoo access rights.
+    """
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    session_id = uuid.uuid4().hex
+    uid = await odoo_client.authenticate(request.login, request.password, session_id,
+                                         (datetime.now(timezone.utc) + access_token_expires).timestamp())
+    staff = await odoo_client.get_staff_info(uid, request.password)
+    if not staff:
+        await odoo_client.logout(uid, session_id)
+        raise HTTPException(status_code=403, detail="Staff account required")
+    access_token = create_access_token(data={"jti": session_id, "role": "staff", "email": staff["login"], "name": staff["name"],
+                                             "user_id": [staff["id"], staff["name"]]}, expires_delta=access_token_expires)
+    return Token(access_token=access_token)
+
+@router.post("/logout")
+async def logout(current_user: dict = Depends(deps.get_current_session), odoo_client: OdooClient = Depends(deps.get_odoo_client)):
+    await odoo_client.logout(current_user["user_id"][0], current_user.get("jti"))
+    return {"success": True}
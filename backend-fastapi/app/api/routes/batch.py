@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.api import deps
+from app.schemas.batch import BatchRequest, BatchResponse
+from app.services.odoo_client import OdooClient
+
+router = APIRouter(tags=["batch"])
+
+
+def to_odoo_request(call, current_user: dict) -> dict:
+    """Map a public batch operation onto the Odoo model method that serves it."""
+    if call.op == "doctor_list":
+        return {"name": call.name, "model": "emr.provider", "method": "get_doctor_data", "args": [[]]}
+    if call.op == "doctor_availability":
+        try:
+            args = [int(call.params["doctor_id"]), str(call.params["clinic_type"])]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"'{call.name}': doctor_availability needs doctor_id and clinic_type")
+        return {"name": call.name, "model": "emr.provider", "method": "get_doctor_availability", "args": args}
+    # appointments are always scoped to the caller, never to a client-supplied patient
+    return {"name": call.name, "model": "appointment.appointment", "method": "get_user_appointments", "args": [current_user["uid"]]}
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def run_batch(payload: BatchRequest, current_user: dict = Depends(deps.get_current_user),
+                    odoo_client: OdooClient = Depends(deps.get_odoo_client)):
+    names = [call.name for call in payload.calls]
+    if len(set(names)) != len(names):
+        raise ValueError("Batch call names must be unique")
+    requests = [to_odoo_request(call, current_user) for call in payload.calls]
+    try:
+        results = await odoo_client.batch(current_user["user_id"][0], requests)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return BatchResponse(success=True, results=results)
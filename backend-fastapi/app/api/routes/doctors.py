@@ -1,45 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from app.api import deps
 from app.schemas.doctors import DoctorResponse, DoctorAvailability
 from app.services.odoo_client import OdooClient
-import redis, json
+from app.services.cache import DOCTOR_LIST_VERSION_KEY, RedisCache, doctor_list_key, availability_key
 from app.core.config import settings
 
-odoo_client = OdooClient()
 router = APIRouter(prefix="/doctor", tags=["doctors"])
-redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
-CACHE_TTL = 300  # cache time in seconds (1 minute)
+
+
+def cached_response(result) -> Response:
+    # Responses sit behind auth, so only the browser may keep them; it must revalidate every time
+    headers = {"ETag": result.etag, "Cache-Control": "private, no-cache"}
+    if result.not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=result.body, media_type="application/json", headers=headers)
+
 
 @router.get("/list", response_model=DoctorResponse)
-def get_doctor_list(current_user: dict = Depends(deps.get_current_user)):
+async def get_doctor_list(request: Request, clinic_type: str | None = None, available: bool = False,
+                          limit: int | None = Query(None, ge=1, le=200), offset: int = Query(0, ge=0),
+                          current_user: dict = Depends(deps.get_current_user),
+                          odoo_client: OdooClient = Depends(deps.get_odoo_client), cache: RedisCache = Depends(deps.get_cache)):
     uid = current_user["user_id"][0]
-    cache_key = f"doctor_list:{uid}"
-    cached = redis_client.get(cache_key)
-    if cached:
-        doctors = json.loads(cached)
-    else:
-        try:
-            doctors = odoo_client.get_doctor_list(uid)
-            if not doctors:
-                raise HTTPException(status_code=404, detail="No doctors found")
-            redis_client.setex(cache_key, CACHE_TTL, json.dumps(doctors))
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-    return DoctorResponse(success=True, doctorData=doctors)
+    # Each filtered page is cached on its own under the shared directory version
+    query = ":".join(f"{k}={v}" for k, v in (("clinic_type", clinic_type), ("available", available or None),
+                                             ("limit", limit), ("offset", offset or None)) if v is not None)
+
+    async def load():
+        doctors = await odoo_client.get_doctor_list(uid, clinic_type, available, limit, offset)
+        # An empty filtered page is a valid answer; only an empty directory is an error
+        if not doctors and not query:
+            raise HTTPException(status_code=404, detail="No doctors found")
+        return DoctorResponse(success=True, doctorData=doctors).model_dump_json()
+
+    version = await cache.version(DOCTOR_LIST_VERSION_KEY)
+    try:
+        result = await cache.get(doctor_list_key(version, query), load, settings.DOCTOR_LIST_CACHE_TTL,
+                                 if_none_match=request.headers.get("if-none-match"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return cached_response(result)
 
 
 @router.get("/{clinic_type}/{doctor_id}/availability", response_model=DoctorAvailability)
-def get_doctor_availability(clinic_type: str, doctor_id: int, current_user: dict = Depends(deps.get_current_user)):
+async def get_doctor_availability(clinic_type: str, doctor_id: int, request: Request, current_user: dict = Depends(deps.get_current_user),
+                                  odoo_client: OdooClient = Depends(deps.get_odoo_client), cache: RedisCache = Depends(deps.get_cache)):
     uid = current_user["user_id"][0]
-    cache_key = f"doctor_availability:{clinic_type}:{doctor_id}"
-    cached = redis_client.get(cache_key)
-    if cached:
-        return json.loads(cached)
-    try:
-        availability = odoo_client.get_doctor_availability(uid, doctor_id, clinic_type)
+
+    async def load():
+        availability = await odoo_client.get_doctor_availability(uid, doctor_id, clinic_type)
         if not availability:
             raise HTTPException(status_code=404, detail="Doctor not found")
-        redis_client.setex(cache_key, 30, json.dumps(availability))
-        return availability
+        return DoctorAvailability(**availability).model_dump_json()
+
+    try:
+        result = await cache.get(availability_key(clinic_type, doctor_id), load, settings.AVAILABILITY_CACHE_TTL,
+                                 if_none_match=request.headers.get("if-none-match"))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return cached_response(result)
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from app.api import deps
 from app.schemas.user import UserResponse, UserData, BookAppointmentRequest
 from app.services.odoo_client import OdooClient
 
 router = APIRouter(prefix="/user", tags=["users"])
-odoo_client = OdooClient()
 
 
 @router.get("/get-profile", response_model=UserResponse)
-def get_me(current_user: dict = Depends(deps.get_current_user)):
+async def get_me(current_user: dict = Depends(deps.get_current_user)):
 
     return UserResponse(
         success=True,
@@ -23,26 +24,61 @@ def get_me(current_user: dict = Depends(deps.get_current_user)):
     )
 
 @router.post("/book-appointment")
-def book_appointment(payload: BookAppointmentRequest, current_user=Depends(deps.get_current_user)):
+async def book_appointment(payload: BookAppointmentRequest, current_user=Depends(deps.get_current_user),
+                           odoo_client: OdooClient = Depends(deps.get_odoo_client)):
     try:
-        result = odoo_client.book_appointment(
+        result = await odoo_client.book_appointment(
             uid=current_user['user_id'][0],
             slot_id=payload.slotId,
             patient_id=current_user['uid'],
             note=payload.note
         )
         if not result.get("success"):
-            raise HTTPException(status_code=400, detail=result.get("message"))
+            # Someone else claimed the slot first: the client should refresh availability and pick again
+            status_code = 409 if result.get("code") == "slot_unavailable" else 400
+            raise HTTPException(status_code=status_code, detail=result.get("message"))
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/appointments")
-def list_appointments(current_user: dict = Depends(deps.get_current_user)):
+async def list_appointments(response: Response, scope: Literal["all", "upcoming", "past", "cancelled"] = "all",
+                            cursor: str | None = None, limit: int | None = Query(None, ge=1, le=100),
+                            current_user: dict = Depends(deps.get_current_user), odoo_client: OdooClient = Depends(deps.get_odoo_client)):
     try:
-        appointments = odoo_client.get_user_appointments(current_user["user_id"][0], current_user['uid'])
-        return appointments
+        page = await odoo_client.get_user_appointments(current_user["user_id"][0], current_user['uid'], scope, cursor, limit)
+        # The body stays a plain list for existing clients; the next page is announced in a header
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
+        return page["appointments"]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-        
\ No newline at end of file
+        
+
+def to_odoo_datetime(value: datetime | None) -> str | None:
+    # Odoo stores naive UTC datetimes
+    if value is None:
+        return None
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@router.get("/vitals/{metric}")
+async def vitals_series(metric: Literal["systolic_bp", "diastolic_bp", "heart_rate", "respiratory_rate", "temperature",
+                                        "spo2", "weight", "height", "bmi"],
+                        date_from: datetime | None = None, date_to: datetime | None = None,
+                        points: int = Query(200, ge=3, le=2000),
+                        current_user: dict = Depends(deps.get_current_user), odoo_client: OdooClient = Depends(deps.get_odoo_client)):
+    # Always the caller's own record; Odoo downsamples so the chart gets at most `points` points
+    try:
+        return await odoo_client.get_vitals_series(
+            current_user["user_id"][0], current_user["uid"], metric,
+            to_odoo_datetime(date_from), to_odoo_datetime(date_to),
+            points,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,90 @@
+import csv
+from datetime import datetime
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.api import deps
+from app.api.routes.users import to_odoo_datetime
+from app.core.config import settings
+from app.core.metrics import timed
+from app.schemas.vitals import IngestResponse, IngestError
+from app.services.odoo_client import OdooClient
+
+router = APIRouter(prefix="/vitals", tags=["vitals"])
+
+READING_FIELDS = {"patient_id", "patient_identifier", "recorded_at", "blood_pressure", "heart_rate",
+                  "respiratory_rate", "temperature", "spo2"}
+
+
+def parse_readings(body: bytes, content_type: str) -> list:
+    """Split a request body into raw readings: JSON lines, CSV with a header row, or a JSON array."""
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/json-lines"):
+        readings = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                readings.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                readings.append(None)
+        return readings
+    if content_type == "text/csv":
+        return list(csv.DictReader(body.decode("utf-8-sig").splitlines()))
+    if content_type == "application/json":
+        try:
+            readings = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            raise ValueError("Body is not valid JSON")
+        if not isinstance(readings, list):
+            raise ValueError("Expected a JSON array of readings")
+        return readings
+    raise HTTPException(status_code=415, detail="Send application/x-ndjson, text/csv or a JSON array")
+
+
+def normalize_reading(reading) -> dict:
+    """Keep the known columns, drop empty CSV cells and convert ISO 8601 timestamps to Odoo's UTC format."""
+    if not isinstance(reading, dict):
+        raise ValueError("Reading must be a JSON object")
+    values = {key: value for key, value in reading.items() if key in READING_FIELDS and value not in (None, "")}
+    if "recorded_at" in values:
+        try:
+            values["recorded_at"] = to_odoo_datetime(datetime.fromisoformat(str(values["recorded_at"])))
+        except ValueError:
+            raise ValueError("recorded_at must be an ISO 8601 datetime")
+    return values
+
+
+@router.post("/ingest", response_model=IngestResponse)
+async def ingest_vitals(request: Request, current_user: dict = Depends(deps.get_current_staff),
+                        odoo_client: OdooClient = Depends(deps.get_odoo_client)):
+    """Bulk-load device readings.
+
+    Rows that cannot be parsed here or fail validation in Odoo are returned in
+    ``errors`` with their 0-based position in the submitted batch; the rest are
+    stored in one insert. Only staff tokens (see /auth/staff/login) are
+    accepted; Odoo then requires create access on patient.vitals.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    with timed("parse"):
+        readings = parse_readings(await request.body(), content_type)
+    if len(readings) > settings.VITALS_INGEST_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.VITALS_INGEST_MAX_ROWS} readings per request")
+
+    valid, positions, errors = [], [], []
+    for row, reading in enumerate(readings):
+        try:
+            valid.append(normalize_reading(reading))
+            positions.append(row)
+        except ValueError as e:
+            errors.append(IngestError(row=row, message=str(e)))
+
+    created = 0
+    if valid:
+        try:
+            result = await odoo_client.ingest_vitals(current_user["user_id"][0], valid)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        created = result["created"]
+        # Odoo numbers rows within what it was sent; map them back onto the caller's batch
+        errors += [IngestError(row=positions[error["row"]], message=error["message"]) for error in result["errors"]]
+    errors.sort(key=lambda error: error.row)
+    return IngestResponse(success=True, created=created, rejected=len(errors), errors=errors)
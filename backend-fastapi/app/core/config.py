@@ -17,4 +17,42 @@ class Settings(BaseSettings):
     REDIS_URL: str = os.getenv('REDIS_URL')
     ENCRYPTION_KEY:str = os.getenv("ENCRYPTION_KEY")
 
+    # One Redis pool per worker, shared by the caches, the session store and the invalidation listener
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+
+    # Odoo transport: keep-alive pool shared by all in-flight calls of a worker
+    ODOO_PROTOCOL: str = "xmlrpc"  # "xmlrpc" or "jsonrpc"
+    ODOO_POOL_SIZE: int = 20
+    ODOO_KEEPALIVE_EXPIRY: float = 30.0
+    ODOO_TIMEOUT: float = 15.0
+    ODOO_CONNECT_TIMEOUT: float = 5.0
+    ODOO_MAX_RETRIES: int = 2
+    ODOO_RETRY_BACKOFF: float = 0.1
+
+    # Gateway caches are evicted by Odoo events, so TTLs only bound staleness if an event is lost
+    DOCTOR_LIST_CACHE_TTL: int = 6 * 3600
+    AVAILABILITY_CACHE_TTL: int = 3600
+    CACHE_LISTENER_RETRY_DELAY: float = 1.0
+    CACHE_STALE_TTL: int = 600  # how long an expired entry may be served while it is refreshed
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+    CACHE_LOCK_TTL: float = 10.0
+    CACHE_LOCK_WAIT: float = 3.0
+    LOCAL_CACHE_MAX_ENTRIES: int = 1024
+    LOCAL_CACHE_TTL: float = 5.0
+
+    # Per-worker memory cache of decrypted Odoo credentials
+    CREDENTIAL_CACHE_TTL: float = 60.0
+    CREDENTIAL_CACHE_MAX_ENTRIES: int = 10000
+    # Store a per-user Odoo API key instead of the login password
+    ODOO_USE_API_KEYS: bool = False
+    ODOO_API_KEY_LIFETIME_DAYS: int = 1
+
+    # Bulk vitals ingestion: readings per request, and the Odoo timeout for that call
+    VITALS_INGEST_MAX_ROWS: int = 10000
+    VITALS_INGEST_TIMEOUT: float = 120.0
+
+    # When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_TOKEN: str | None = None
+
 settings = Settings()
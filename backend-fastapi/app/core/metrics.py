@@ -0,0 +1,69 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_LATENCY = Histogram("gateway_request_seconds", "Gateway request latency", ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+REQUEST_PHASE_LATENCY = Histogram("gateway_request_phase_seconds", "Time spent per hop inside a request", ["route", "phase"], buckets=LATENCY_BUCKETS)
+RESPONSE_BYTES = Histogram("gateway_response_bytes", "Gateway response body size", ["route"], buckets=BYTES_BUCKETS)
+ODOO_LATENCY = Histogram("gateway_odoo_call_seconds", "Odoo RPC latency", ["call"], buckets=LATENCY_BUCKETS)
+ODOO_RESPONSE_BYTES = Histogram("gateway_odoo_response_bytes", "Odoo RPC response size", ["call"], buckets=BYTES_BUCKETS)
+ODOO_ERRORS = Counter("gateway_odoo_call_errors_total", "Odoo RPC calls that raised", ["call"])
+CACHE_LOOKUPS = Counter("gateway_cache_lookups_total", "Cache lookups per layer", ["cache", "layer", "result"])
+POOL_CONNECTIONS = Gauge("gateway_pool_connections", "Connection pool usage", ["pool", "state"], multiprocess_mode="livesum")
+
+# Per-request phase timings, filled by the auth dependency, the cache and the Odoo transport
+_timings: ContextVar[dict | None] = ContextVar("server_timings", default=None)
+
+
+def start_request_timings() -> dict:
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def record_timing(phase: str, seconds: float, desc: str | None = None):
+    timings = _timings.get()
+    if timings is None:
+        return
+    total, previous_desc = timings.get(phase, (0.0, None))
+    timings[phase] = (total + seconds, desc or previous_desc)
+
+
+@contextmanager
+def timed(phase: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(phase, time.perf_counter() - started)
+
+
+def server_timing_header(timings: dict) -> str:
+    entries = []
+    for phase, (seconds, desc) in timings.items():
+        entry = f"{phase};dur={seconds * 1000:.1f}"
+        entries.append(f'{entry};desc="{desc}"' if desc else entry)
+    return ", ".join(entries)
+
+
+def observe_odoo_call(call: str, seconds: float, nbytes: int | None):
+    ODOO_LATENCY.labels(call).observe(seconds)
+    if nbytes is None:
+        ODOO_ERRORS.labels(call).inc()
+    else:
+        ODOO_RESPONSE_BYTES.labels(call).observe(nbytes)
+    record_timing("odoo", seconds)
+
+
+def render_latest() -> bytes:
+    # Under several uvicorn workers each process writes its samples to PROMETHEUS_MULTIPROC_DIR
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
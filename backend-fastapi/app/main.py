@@ -1,11 +1,27 @@
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
-from app.api.routes import auth, users, doctors
+import secrets
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException, Depends
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.api import deps
+from app.core import metrics
+from app.core.config import settings
+from app.api.routes import auth, users, doctors, batch, vitals
 from app.schemas.user import ErrorResponse
+from app.services.container import Services
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import ValidationError
 
-app = FastAPI(title="FastAPI Odoo Auth Wrapper")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Each uvicorn worker builds its own container, so pools are never shared across processes
+    app.state.services = Services()
+    await app.state.services.start()
+    yield
+    await app.state.services.aclose()
+
+app = FastAPI(title="FastAPI Odoo Auth Wrapper", lifespan=lifespan)
 
 # Handle validation errors (e.g., request data validation)
 @app.exception_handler(ValidationError)
@@ -50,7 +66,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    timings = metrics.start_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    # Label by route template so path parameters don't explode the series count
+    route = request.scope.get("route")
+    route = route.path if route else "unmatched"
+    metrics.REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(elapsed)
+    for phase, (seconds, _) in timings.items():
+        metrics.REQUEST_PHASE_LATENCY.labels(route, phase).observe(seconds)
+    if response.headers.get("content-length"):
+        metrics.RESPONSE_BYTES.labels(route).observe(int(response.headers["content-length"]))
+    metrics.record_timing("total", elapsed)
+    response.headers["Server-Timing"] = metrics.server_timing_header(timings)
+    return response
+
 app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
-app.include_router(doctors.router, prefix="/api")
\ No newline at end of file
+app.include_router(doctors.router, prefix="/api")
+app.include_router(batch.router, prefix="/api")
+app.include_router(vitals.router, prefix="/api")
+
+
+@app.get("/api/cache/stats")
+async def cache_stats(current_user: dict = Depends(deps.get_current_user), services: Services = Depends(deps.get_services)):
+    """Hit ratios of the local and Redis cache layers for the worker serving this request."""
+    return services.cache.stats.snapshot()
+
+
+@app.get("/api/pool/stats")
+async def pool_stats(current_user: dict = Depends(deps.get_current_user), services: Services = Depends(deps.get_services)):
+    """Redis and Odoo connection pool usage for the worker serving this request."""
+    return services.pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request, services: Services = Depends(deps.get_services)):
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not secrets.compare_digest(supplied, settings.METRICS_TOKEN):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    for pool, usage in services.pool_stats().items():
+        for state, value in usage.items():
+            metrics.POOL_CONNECTIONS.labels(pool, state).set(value)
+    return Response(content=metrics.render_latest(), media_type=CONTENT_TYPE_LATEST)
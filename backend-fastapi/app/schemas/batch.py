@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+
+class BatchCall(BaseModel):
+    name: str
+    op: Literal["doctor_list", "doctor_availability", "appointments"]
+    params: Dict[str, Any] = {}
+
+class BatchRequest(BaseModel):
+    calls: List[BatchCall] = Field(min_length=1, max_length=20)
+
+class BatchResult(BaseModel):
+    success: bool
+    result: Optional[Any] = None
+    message: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    success: bool
+    results: Dict[str, BatchResult]
@@ -5,6 +5,11 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+class StaffLoginRequest(BaseModel):
+    # Device accounts need not have an email address as their login
+    login: str
+    password: str
+
 class UserData(BaseModel):
     uid: int
     email: str
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+
+class IngestError(BaseModel):
+    row: int
+    message: str
+
+class IngestResponse(BaseModel):
+    success: bool
+    created: int
+    rejected: int
+    errors: List[IngestError]
@@ -0,0 +1,312 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from app.core.config import settings
+from app.core.metrics import CACHE_LOOKUPS, record_timing, timed
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "emr:cache-invalidation"
+
+
+# The doctor directory is identical for every patient, so one shared copy is cached per version
+DOCTOR_LIST_VERSION_KEY = "doctor_list:version"
+
+
+def doctor_list_key(version, query: str = "") -> str:
+    return f"doctor_list:v{version}:{query}" if query else f"doctor_list:v{version}"
+
+
+def availability_key(clinic_type: str, doctor_id: int) -> str:
+    return f"doctor_availability:{clinic_type}:{doctor_id}"
+
+
+def make_etag(body: str) -> str:
+    return '"%s"' % hashlib.sha256(body.encode()).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Writes a loaded entry only if its key was not invalidated while the loader ran
+STORE_IF_CURRENT_SCRIPT = """
+if (redis.call('get', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('hset', KEYS[1], 'body', ARGV[2], 'etag', ARGV[3], 'fresh_until', ARGV[4], 'delta', ARGV[5])
+redis.call('expire', KEYS[1], ARGV[6])
+return 1
+"""
+
+
+def generation_key(key: str) -> str:
+    return f"gen:{key}"
+
+
+@dataclass
+class CacheResult:
+    etag: str
+    body: Optional[bytes]
+    status: str  # "local", "hit", "stale" or "miss"
+    not_modified: bool = False
+
+
+class LocalCache:
+    """Bounded in-process LRU with a per-entry TTL; each uvicorn worker has its own."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: float | None = None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        self.delete(*[key for key in self._entries if key.startswith(prefix)])
+
+
+class CacheStats:
+    """Per-layer hit/miss counters for one worker."""
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+        self.stale = 0
+
+    def record(self, cache: str, layer: str, hit: bool):
+        (self.hits if hit else self.misses)[layer] += 1
+        CACHE_LOOKUPS.labels(cache, layer, "hit" if hit else "miss").inc()
+
+    def snapshot(self) -> dict:
+        layers = {}
+        for layer in ("local", "redis"):
+            hits, misses = self.hits[layer], self.misses[layer]
+            layers[layer] = {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+        layers["redis"]["stale_served"] = self.stale
+        return layers
+
+
+class RedisCache:
+    """Read-through Redis cache shared by the gateway's cached routes.
+
+    Entries are hashes holding the serialized body, its ETag, a soft expiry and
+    the time the last load took. Past the soft expiry an entry is served stale
+    for ``stale_ttl`` seconds while one background task refreshes it; slightly
+    before it, requests refresh early with a probability that grows as expiry
+    approaches (XFetch). Misses are single-flight: one request loads behind a
+    Redis lock while the others wait for its result.
+
+    A small in-process LocalCache sits in front of Redis and keeps the encoded
+    body and ETag, so hot keys are answered without network I/O. It is kept
+    coherent by the same invalidation events and version counter as Redis;
+    its short TTL only bounds staleness if an event is lost.
+    """
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.local = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_TTL)
+        self.stats = CacheStats()
+        self._release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._store_if_current = redis_client.register_script(STORE_IF_CURRENT_SCRIPT)
+        self._refreshing = set()
+
+    async def version(self, version_key: str) -> str:
+        """Current value of a version counter, served from the local layer when possible."""
+        version = self.local.get(version_key)
+        if version is None:
+            with timed("redis"):
+                version = await self.redis.get(version_key) or "0"
+            self.local.set(version_key, version)
+        return version
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[str]], ttl: int,
+                  stale_ttl: int | None = None, if_none_match: str | None = None) -> CacheResult:
+        """Return the cached body for ``key``, calling ``loader`` when it must be (re)built."""
+        stale_ttl = settings.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        cache_name = key.split(":", 1)[0]
+        local = self.local.get(key)
+        self.stats.record(cache_name, "local", local is not None)
+        if local is not None:
+            record_timing("cache", 0.0, "local")
+            etag, body = local
+            if etag_matches(if_none_match, etag):
+                return CacheResult(etag=etag, body=None, status="local", not_modified=True)
+            return CacheResult(etag=etag, body=body, status="local")
+
+        # A client revalidating its copy only needs the ETag; fetch the body once we know it changed
+        fields = ["etag", "fresh_until", "delta"] + ([] if if_none_match else ["body"])
+        with timed("redis"):
+            etag, fresh_until, delta, *body = await self.redis.hmget(key, fields)
+        self.stats.record(cache_name, "redis", etag is not None)
+        if etag:
+            status = "hit"
+            if self._should_refresh(float(fresh_until or 0), float(delta or 0)):
+                status = "stale"
+                self.stats.stale += 1
+                self._refresh_in_background(key, loader, ttl, stale_ttl)
+            record_timing("cache", 0.0, status)
+            if etag_matches(if_none_match, etag):
+                return CacheResult(etag=etag, body=None, status=status, not_modified=True)
+            if not body:
+                with timed("redis"):
+                    body = [await self.redis.hget(key, "body")]
+            body = body[0]
+            if body is not None:
+                body = body.encode()
+                if status == "hit":
+                    self.local.set(key, (etag, body))
+                return CacheResult(etag=etag, body=body, status=status)
+        record_timing("cache", 0.0, "miss")
+        etag, body, stored = await self._load_once(key, loader, ttl, stale_ttl)
+        body = body.encode()
+        if stored:
+            self.local.set(key, (etag, body))
+        return CacheResult(etag=etag, body=body, status="miss", not_modified=etag_matches(if_none_match, etag))
+
+    def _should_refresh(self, fresh_until: float, delta: float) -> bool:
+        # XFetch: -log(U) is exponentially distributed, so early refreshes spread out ahead of expiry
+        jitter = delta * settings.CACHE_EARLY_REFRESH_BETA * -math.log(random.random() or 1e-12)
+        return time.time() + jitter >= fresh_until
+
+    async def _store(self, key, loader, ttl, stale_ttl) -> tuple[str, str, bool]:
+        """Load ``key`` and cache the result unless it was invalidated meanwhile.
+
+        The key's generation is read before calling the loader and compared
+        when writing: a loader that read Odoo before a change committed, and
+        finished after its invalidation, must not put the old body back.
+        Returns the loaded ETag and body, and whether they were cached.
+        """
+        started = time.time()
+        generation = await self.redis.get(generation_key(key)) or "0"
+        body = await loader()
+        etag = make_etag(body)
+        stored = await self._store_if_current(
+            keys=[key, generation_key(key)],
+            args=[generation, body, etag, time.time() + ttl, time.time() - started, ttl + stale_ttl],
+        )
+        if not stored:
+            logger.debug(f"{key} was invalidated while loading, not caching the result")
+        return etag, body, bool(stored)
+
+    async def _load_once(self, key, loader, ttl, stale_ttl) -> tuple[str, str, bool]:
+        lock_key, token = f"lock:{key}", uuid.uuid4().hex
+        if await self.redis.set(lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TTL * 1000)):
+            try:
+                return await self._store(key, loader, ttl, stale_ttl)
+            finally:
+                await self._release_lock(keys=[lock_key], args=[token])
+        # Another request is already loading this key: wait for its result instead of piling onto Odoo
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            etag, body = await self.redis.hmget(key, ["etag", "body"])
+            if body is not None:
+                return etag, body, True
+        logger.warning(f"Timed out waiting for {key} to be loaded, loading it directly")
+        return await self._store(key, loader, ttl, stale_ttl)
+
+    def _refresh_in_background(self, key, loader, ttl, stale_ttl):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, loader, ttl, stale_ttl))
+        task.add_done_callback(lambda _: self._refreshing.discard(key))
+
+    async def _refresh(self, key, loader, ttl, stale_ttl):
+        lock_key, token = f"lock:{key}", uuid.uuid4().hex
+        try:
+            if not await self.redis.set(lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TTL * 1000)):
+                return  # another worker is already refreshing it
+            try:
+                await self._store(key, loader, ttl, stale_ttl)
+            finally:
+                await self._release_lock(keys=[lock_key], args=[token])
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed, keeping stale entry: {e}")
+
+    async def invalidate(self, events: list[dict]):
+        """Drop the exact entries named by a batch of Odoo invalidation events, in both layers."""
+        keys = set()
+        directory_changed, directory_version = False, None
+        for event in events:
+            if event.get("type") == "availability":
+                keys.add(availability_key(event["clinic_type"], event["doctor_id"]))
+            elif event.get("type") == "doctor_list":
+                directory_changed = True
+                directory_version = event.get("version", directory_version)
+        if keys:
+            self.local.delete(*keys)
+            # Bumping the generation stops loads already in flight from writing the old entry back
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for key in keys:
+                    pipe.incr(generation_key(key))
+                pipe.delete(*keys)
+                await pipe.execute()
+            logger.debug(f"Evicted {len(keys)} cache keys")
+        if directory_changed:
+            # Odoo bumps the shared version once per change; older versions are never read again and age out through their TTL
+            self.local.delete_prefix("doctor_list:")
+            if directory_version is not None:
+                self.local.set(DOCTOR_LIST_VERSION_KEY, str(directory_version))
+
+
+async def listen_for_invalidations(redis_client, handlers: list[Callable[[list[dict]], Awaitable[None]]]):
+    """Subscribe to the invalidation channel until cancelled, passing each event batch to every handler."""
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    events = json.loads(message["data"]).get("events", [])
+                    for handler in handlers:
+                        await handler(events)
+                except (ValueError, KeyError) as e:
+                    logger.error(f"Ignoring malformed invalidation message: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Invalidation listener lost Redis connection ({e!r}), resubscribing")
+            await asyncio.sleep(settings.CACHE_LISTENER_RETRY_DELAY)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,46 @@
+import asyncio
+from redis import asyncio as aioredis
+from app.core.config import settings
+from app.services.cache import RedisCache, listen_for_invalidations
+from app.services.odoo_client import OdooClient, build_transport
+from app.services.session import SecureSessionStore, handle_session_events
+
+
+class Services:
+    """Per-worker connection owners: one Redis pool and one Odoo transport shared by every router."""
+
+    def __init__(self):
+        self.redis_pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            decode_responses=True,
+        )
+        self.redis = aioredis.Redis(connection_pool=self.redis_pool)
+        self.cache = RedisCache(self.redis)
+        self.session_store = SecureSessionStore(self.redis)
+        self.odoo = OdooClient(build_transport(), self.session_store)
+        self._listener = None
+
+    async def start(self):
+        self._listener = asyncio.create_task(
+            listen_for_invalidations(self.redis, [self.cache.invalidate, handle_session_events])
+        )
+
+    async def aclose(self):
+        if self._listener:
+            self._listener.cancel()
+        # Drain the keep-alive pools so workers shut down without dangling sockets
+        await self.odoo.aclose()
+        await self.redis.aclose()
+        await self.redis_pool.disconnect()
+
+    def pool_stats(self) -> dict:
+        return {
+            "redis": {
+                "max_connections": self.redis_pool.max_connections,
+                "in_use": len(self.redis_pool._in_use_connections),
+                "idle": len(self.redis_pool._available_connections),
+            },
+            "odoo": self.odoo.transport.pool_stats(),
+        }
@@ -1,70 +1,276 @@
+import asyncio
+import itertools
+import logging
+import time
 import xmlrpc.client
+import httpx
+import orjson
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.metrics import observe_odoo_call
 from app.services.session import SecureSessionStore
 
+logger = logging.getLogger(__name__)
+
+# Failures raised before the request reached Odoo (refused, connect timeout, pool exhausted),
+# so replaying is safe even for writes. RemoteProtocolError is left out: it can arrive after
+# Odoo has committed, and replaying a booking or an ingest would apply it twice.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class OdooTransport:
+    """Base transport: owns the keep-alive pool and retry policy, subclasses own the wire format."""
+    content_type = None
+
+    def __init__(self, url: str):
+        self.max_retries = settings.ODOO_MAX_RETRIES
+        self.http = httpx.AsyncClient(
+            base_url=url,
+            limits=httpx.Limits(
+                max_connections=settings.ODOO_POOL_SIZE,
+                max_keepalive_connections=settings.ODOO_POOL_SIZE,
+                keepalive_expiry=settings.ODOO_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.ODOO_TIMEOUT, connect=settings.ODOO_CONNECT_TIMEOUT),
+            headers={"Content-Type": self.content_type},
+        )
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def pool_stats(self) -> dict:
+        return {
+            "max_connections": settings.ODOO_POOL_SIZE,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+    def encode(self, service: str, method: str, args: tuple) -> tuple[str, bytes]:
+        """Return the endpoint path and request body for one call."""
+        raise NotImplementedError
+
+    def decode(self, content: bytes):
+        """Return the call result, raising xmlrpc.client.Fault on a server-side error."""
+        raise NotImplementedError
+
+    async def call(self, service: str, method: str, *args, timeout: float | None = None):
+        path, payload = self.encode(service, method, args)
+        # Label execute_kw calls by the Odoo model method they reach, e.g. "emr.provider.get_doctor_data"
+        call = f"{args[3]}.{args[4]}" if method == "execute_kw" else f"{service}.{method}"
+        started = time.perf_counter()
+        nbytes = None
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await self.http.post(
+                        path, content=payload,
+                        timeout=httpx.Timeout(timeout, connect=settings.ODOO_CONNECT_TIMEOUT) if timeout else httpx.USE_CLIENT_DEFAULT,
+                    )
+                    response.raise_for_status()
+                    break
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = settings.ODOO_RETRY_BACKOFF * (2 ** attempt)
+                    logger.warning(f"Odoo {service}.{method} failed ({e!r}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+            result = self.decode(response.content)
+            nbytes = len(response.content)
+            return result
+        finally:
+            self.in_flight -= 1
+            observe_odoo_call(call, time.perf_counter() - started, nbytes)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+class XmlRpcTransport(OdooTransport):
+    """Odoo's /xmlrpc/2 endpoints, marshalled with the stdlib xmlrpc.client."""
+    content_type = "text/xml"
+
+    def encode(self, service, method, args):
+        return f"/xmlrpc/2/{service}", xmlrpc.client.dumps(args, method, allow_none=True).encode()
+
+    def decode(self, content):
+        result, _ = xmlrpc.client.loads(content, use_builtin_types=True)
+        return result[0]
+
+
+class JsonRpcTransport(OdooTransport):
+    """Odoo's /jsonrpc endpoint, serialized with orjson."""
+    content_type = "application/json"
+
+    def __init__(self, url: str):
+        super().__init__(url)
+        self._ids = itertools.count(1)
+
+    def encode(self, service, method, args):
+        return "/jsonrpc", orjson.dumps({
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": args},
+            "id": next(self._ids),
+        })
+
+    def decode(self, content):
+        response = orjson.loads(content)
+        error = response.get("error")
+        if error:
+            # Surface Odoo errors the same way ServerProxy does so callers stay transport-agnostic
+            data = error.get("data") or {}
+            raise xmlrpc.client.Fault(error.get("code", 0), data.get("message") or error.get("message", ""))
+        return response.get("result")
+
+
+TRANSPORTS = {
+    "xmlrpc": XmlRpcTransport,
+    "jsonrpc": JsonRpcTransport,
+}
+
+
+def build_transport() -> OdooTransport:
+    return TRANSPORTS[settings.ODOO_PROTOCOL](settings.ODOO_URL)
+
+
 class OdooClient:
-    def __init__(self):
+    def __init__(self, transport: OdooTransport, session_store: SecureSessionStore):
         self.url = settings.ODOO_URL
         self.db = settings.ODOO_DB
         self.token = settings.ODOO_API_KEY
-        self.common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common")
-        self.models = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/object")
-        self.session_store = SecureSessionStore()
+        self.transport = transport
+        self.session_store = session_store
 
-    def authenticate(self, username: str, password: str):
-        uid = self.common.authenticate(self.db, username, password, {})
+    async def _call(self, service: str, method: str, *args, timeout: float | None = None):
+        return await self.transport.call(service, method, *args, timeout=timeout)
+
+    async def execute_kw(self, uid: int, password: str, model: str, method: str, args: list, kwargs: dict | None = None,
+                         timeout: float | None = None):
+        return await self._call("object", "execute_kw", self.db, uid, password, model, method, args, kwargs or {},
+                                timeout=timeout)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    async def authenticate(self, username: str, password: str, session_id: str, expires_at: float):
+        uid = await self._call("common", "authenticate", self.db, username, password, {})
         if not uid:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-        self.session_store.save_user_credentials(uid, password)
+        credential = password
+        if settings.ODOO_USE_API_KEYS:
+            try:
+                credential = await self.get_or_create_api_key(uid, password)
+            except Exception as e:
+                logger.warning(f"Could not issue an API key for user {uid}, storing the password instead: {e}")
+        await self.session_store.save_user_credentials(uid, credential)
+        await self.session_store.add_session(uid, session_id, expires_at)
         return uid
-    
-    def get_or_create_api_key(self, uid: int, password: str, scope="emr") -> str:
-        return self.models.execute_kw(
-            self.db, uid, password,
+
+    async def get_or_create_api_key(self, uid: int, password: str, scope="rpc") -> str:
+        # Odoo only accepts keys scoped to 'rpc' (or unscoped) on its external API
+        return await self.execute_kw(
+            uid, password,
             "res.users", "get_or_create_api_key",
-            [uid], {"scope": scope}
+            [uid], {"scope": scope, "lifetime_days": settings.ODOO_API_KEY_LIFETIME_DAYS}
         )
 
-    def get_user_info(self, uid: int, password: str):
-        user = self.models.execute_kw(
-            self.db, uid, password,
-        "patient.record", "search_read",
-        [[("user_id", "=", uid)]],
-        {"fields": ["id","name","email","user_id", "date_of_birth","phone","gender"]}
+    async def logout(self, uid: int, session_id: str | None = None):
+        """End one gateway session; the last one to end forgets the stored credential.
+
+        The credential (and in API key mode the Odoo key) is shared by all of
+        a user's sessions, so it is only removed, and the key revoked, once no
+        other session of the user is live.
+        """
+        if await self.session_store.end_session(uid, session_id):
+            return
+        if settings.ODOO_USE_API_KEYS:
+            credential = await self.session_store.get_user_password(uid)
+            if credential:
+                try:
+                    await self.execute_kw(uid, credential, "res.users", "revoke_gateway_api_keys", [uid])
+                except Exception as e:
+                    logger.warning(f"Could not revoke API key for user {uid}: {e}")
+        await self.session_store.remove_user_credentials(uid)
+
+    async def get_user_info(self, uid: int, password: str):
+        user = await self.execute_kw(
+            uid, password,
+            "patient.record", "search_read",
+            [[("user_id", "=", uid)]],
+            {"fields": ["id","name","email","user_id", "date_of_birth","phone","gender"]}
         )
         return user[0] if user else None
-    
-    def get_doctor_list(self, uid:int):
-        password = self.session_store.get_user_password(uid)
-        doctors = self.models.execute_kw(
-            self.db, uid, password,
-            'emr.provider', 'get_doctor_data', [[]]
+
+    async def get_staff_info(self, uid: int, password: str):
+        """The Odoo user behind a staff login, or None for portal (patient) users."""
+        user = await self.execute_kw(
+            uid, password,
+            "res.users", "search_read",
+            [[("id", "=", uid)]],
+            {"fields": ["id", "name", "login", "share"]}
+        )
+        return user[0] if user and not user[0]["share"] else None
+
+    async def get_doctor_list(self, uid:int, clinic_type: str | None = None, available_only: bool = False,
+                              limit: int | None = None, offset: int = 0):
+        password = await self.session_store.get_user_password(uid)
+        doctors = await self.execute_kw(
+            uid, password,
+            'emr.provider', 'get_doctor_data', [[]],
+            {"clinic_type_slug": clinic_type, "available_only": available_only, "limit": limit, "offset": offset}
         )
         return doctors
-    
-    def get_doctor_availability(self, uid: int, doctor_id:int, clinic_type):
-        password = self.session_store.get_user_password(uid)
-        return self.models.execute_kw(
-            self.db, uid, password,
+
+    async def get_doctor_availability(self, uid: int, doctor_id:int, clinic_type):
+        password = await self.session_store.get_user_password(uid)
+        return await self.execute_kw(
+            uid, password,
             "emr.provider", "get_doctor_availability",
             [doctor_id, clinic_type]
         )
-    
-    def book_appointment(self, uid: int, slot_id: int, patient_id: int, note: str):
-        password = self.session_store.get_user_password(uid)
-        return self.models.execute_kw(
-            self.db, uid, password,
+
+    async def book_appointment(self, uid: int, slot_id: int, patient_id: int, note: str):
+        password = await self.session_store.get_user_password(uid)
+        return await self.execute_kw(
+            uid, password,
             "appointment.appointment", "book_appointment",
             [slot_id, patient_id, note]
         )
 
-    def get_user_appointments(self, uid: int, patient_id:int):
-        password = self.session_store.get_user_password(uid)
-        return self.models.execute_kw(
-            self.db, uid, password,
-            "appointment.appointment", "get_user_appointments",
-            [patient_id]
+    async def get_user_appointments(self, uid: int, patient_id:int, scope: str = "all",
+                                    cursor: str | None = None, limit: int | None = None):
+        password = await self.session_store.get_user_password(uid)
+        return await self.execute_kw(
+            uid, password,
+            "appointment.appointment", "get_user_appointments_page",
+            [patient_id],
+            {"scope": scope, "cursor": cursor, "limit": limit}
         )
 
+    async def get_vitals_series(self, uid: int, patient_id: int, metric: str, date_from: str | None = None,
+                                date_to: str | None = None, points: int = 200):
+        password = await self.session_store.get_user_password(uid)
+        return await self.execute_kw(
+            uid, password,
+            "patient.vitals.rollup", "get_series",
+            [patient_id, metric],
+            {"date_from": date_from, "date_to": date_to, "points": points}
+        )
 
+    async def ingest_vitals(self, uid: int, readings: list[dict]):
+        password = await self.session_store.get_user_password(uid)
+        return await self.execute_kw(
+            uid, password,
+            "patient.vitals", "ingest",
+            [readings], timeout=settings.VITALS_INGEST_TIMEOUT
+        )
+
+    async def batch(self, uid: int, requests: list[dict]):
+        """Run several named sub-requests through emr.api.batch in a single round-trip."""
+        password = await self.session_store.get_user_password(uid)
+        return await self.execute_kw(
+            uid, password,
+            "emr.api", "batch",
+            [requests]
+        )
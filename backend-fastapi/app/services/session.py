@@ -1,17 +1,32 @@
 from typing import Optional
 from datetime import datetime, timedelta
 from app.core.config import settings
-import redis
+from redis import asyncio as aioredis
 from cryptography.fernet import Fernet
+from app.services.cache import INVALIDATION_CHANNEL, LocalCache
 import base64
+import json
 import logging
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
+# Decrypted credentials of recently active users, so hot users skip the Redis GET and Fernet
+# decrypt. Kept short-lived and dropped in every worker via handle_session_events whenever the
+# stored credential changes or is removed.
+_credential_cache = LocalCache(settings.CREDENTIAL_CACHE_MAX_ENTRIES, settings.CREDENTIAL_CACHE_TTL)
+
+
+async def handle_session_events(events: list[dict]):
+    for event in events:
+        if event.get("type") == "credentials":
+            _credential_cache.delete(str(event["uid"]))
+
+
 class SecureSessionStore:
-    def __init__(self):
-        self.client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    def __init__(self, redis_client: aioredis.Redis):
+        self.client = redis_client
         self.fernet = self._initialize_fernet()
     
     def _initialize_fernet(self) -> Fernet:
@@ -36,32 +51,66 @@ class SecureSessionStore:
             logger.error(f"Password decryption failed: {e}")
             return None
     
-    def save_user_credentials(self, uid: int, password: str, lifetime_minutes: int = 60):
+    async def save_user_credentials(self, uid: int, password: str, lifetime_minutes: int = 60):
         try:
             encrypted_password = self.encrypt_password(password)
             expiration_seconds = lifetime_minutes * 60
-            self.client.setex(f"user:{uid}:encrypted_pwd", expiration_seconds, encrypted_password)
+            await self.client.setex(f"user:{uid}:encrypted_pwd", expiration_seconds, encrypted_password)
+            await self._broadcast_change(uid)
             logger.info(f"Encrypted password saved for user {uid}")
         except Exception as e:
             logger.error(f"Failed to save encrypted password: {e}")
             raise
     
-    def get_user_password(self, uid: int) -> Optional[str]:
+    async def get_user_password(self, uid: int) -> Optional[str]:
+        password = _credential_cache.get(str(uid))
+        if password is not None:
+            return password
         try:
-            encrypted_password = self.client.get(f"user:{uid}:encrypted_pwd")
+            encrypted_password = await self.client.get(f"user:{uid}:encrypted_pwd")
             if not encrypted_password:
                 logger.warning(f"No encrypted password found for user {uid}")
                 return None
-            return self.decrypt_password(encrypted_password)
+            password = self.decrypt_password(encrypted_password)
+            if password is not None:
+                _credential_cache.set(str(uid), password)
+            return password
         except Exception as e:
             logger.error(f"Failed to retrieve password: {e}")
             return None
     
-    def remove_user_credentials(self, uid: int):
+    async def add_session(self, uid: int, session_id: str, expires_at: float, lifetime_minutes: int = 60):
+        """Record a live gateway session of ``uid``, scored by the expiry of its token."""
+        key = f"user:{uid}:sessions"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {session_id: expires_at})
+            # Sessions are only meaningful while the shared credential lives
+            pipe.expire(key, lifetime_minutes * 60)
+            await pipe.execute()
+
+    async def end_session(self, uid: int, session_id: Optional[str]) -> int:
+        """Forget one session and return how many of the user's sessions are still live."""
+        key = f"user:{uid}:sessions"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, "-inf", time.time())
+            if session_id:
+                pipe.zrem(key, session_id)
+            pipe.zcard(key)
+            *_, remaining = await pipe.execute()
+        return remaining
+
+    async def remove_user_credentials(self, uid: int):
         """Remove stored credentials"""
-        return self.client.delete(f"user:{uid}:encrypted_pwd")
+        deleted = await self.client.delete(f"user:{uid}:encrypted_pwd")
+        await self._broadcast_change(uid)
+        return deleted
+
+    async def _broadcast_change(self, uid: int):
+        # Every worker, this one included, may hold the previous credential in memory
+        _credential_cache.delete(str(uid))
+        await self.client.publish(INVALIDATION_CHANNEL, json.dumps({"events": [{"type": "credentials", "uid": uid}]}))
     
-    def get_credentials_ttl(self, uid: int) -> int:
+    async def get_credentials_ttl(self, uid: int) -> int:
         """Get remaining time for credentials"""
-        return self.client.ttl(f"user:{uid}:encrypted_pwd")
+        return await self.client.ttl(f"user:{uid}:encrypted_pwd")
     
@@ -15,6 +15,7 @@ This module is designed to manage patient appointments efficiently. It allows fo
         'security/ir.model.access.csv',
         'views/available_slots.xml',
         'views/timeslot.xml',
+        'views/schedule_template.xml',
         'views/appointment_visit.xml',
         'views/appointment.xml',
         'views/patient_record.xml',
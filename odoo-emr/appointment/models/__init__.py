@@ -1 +1 @@
-from . import appointment, timeslot, appointment_visit, patient_record
\ No newline at end of file
+from . import appointment, timeslot, appointment_visit, patient_record, emr_api, schedule_template
\ No newline at end of file
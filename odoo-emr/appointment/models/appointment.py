@@ -1,5 +1,10 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, modules, _
+from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
+import base64
+import logging
+import time
+_logger = logging.getLogger(__name__)
 
 class MedicalAppointment(models.Model):
     _name = 'appointment.appointment'
@@ -41,11 +46,28 @@ class MedicalAppointment(models.Model):
     age = fields.Integer(string="Age", related="patient_id.age")
     active = fields.Boolean('Active', default=True)
 
+    _missed_batch_size = 500
+    _missed_time_budget = 60  # seconds per cron run
+
     _sql_constraints = [
     ('unique_appointment_id', 'unique(appointment_id)', 'Appointment ID must be unique!'),
     ('unique_slot_booking', 'unique(granular_slot_id)', 'This slot is already booked.'),
 ]
 
+    def init(self):
+        # The missed-appointment cron only ever scans scheduled appointments by start time
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS appointment_appointment_scheduled_start_idx
+                ON appointment_appointment (start_datetime, id)
+             WHERE state = 'scheduled'
+        """)
+        # Keyset pages of one patient's history
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS appointment_appointment_patient_start_idx
+                ON appointment_appointment (patient_id, start_datetime, id)
+             WHERE status = 'confirmed'
+        """)
+
     @api.constrains('provider_id', 'patient_id')
     def _check_provider_patient(self):
         for rec in self:
@@ -186,60 +208,123 @@ class MedicalAppointment(models.Model):
     }
 
     def _cron_mark_missed_appointments(self):
-        """Cron job to mark overdue scheduled appointments as missed."""
-        now = fields.Datetime.now()
-        overdue_apps = self.search([
-            ('state', '=', 'scheduled'),
-            ('start_datetime', '<', now)
-        ])
-        for app in overdue_apps:
-            app.write({'state': 'missed'})
-            if app.granular_slot_id:
-                app.granular_slot_id.write({'is_booked': False})
+        """Cron job to mark overdue scheduled appointments as missed.
 
+        Works in chunks of ``_missed_batch_size`` with one grouped write per
+        chunk and a commit after each, and stops after ``_missed_time_budget``
+        seconds. Processed appointments leave the search domain, so an
+        interrupted run simply resumes; progress is reported to the cron,
+        which is re-triggered while a backlog remains.
+        """
+        now = fields.Datetime.now()
+        deadline = time.monotonic() + self._missed_time_budget
+        domain = [('state', '=', 'scheduled'), ('start_datetime', '<', now)]
+        done = 0
+        while time.monotonic() < deadline:
+            overdue_apps = self.search(domain, order='start_datetime, id', limit=self._missed_batch_size)
+            if not overdue_apps:
+                break
+            overdue_apps.with_context(tracking_disable=True).write({'state': 'missed'})
+            overdue_apps.granular_slot_id.write({'is_booked': False})
+            done += len(overdue_apps)
+            if not modules.module.current_test:
+                self.env.cr.commit()
+        remaining = self.search_count(domain) if done else 0
+        _logger.info("Marked %s appointments as missed, %s remaining", done, remaining)
+        self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
 
     @api.model
     def book_appointment(self,slot_id,patient_id, note):
-        patient = self.env['patient.record'].search([('id','=',patient_id)], limit=1)
-        Slot = self.env["appointment.available.slot"]
-        slot = Slot.search([
-            ("id", "=", slot_id),
-            ('is_booked','=',False),
-            ("active", "=", True),
-        ], limit=1)
+        """Claim a free slot and create the confirmed appointment for it.
 
+        The slot is claimed atomically, so concurrent bookings of the same
+        slot get a clear "slot unavailable" answer instead of a unique
+        constraint error raised after the appointment was built.
+        """
+        patient = self.env['patient.record'].browse(patient_id).exists()
+        slot = self.env["appointment.available.slot"]._claim(slot_id)
         if not slot:
-            return {"success": False, "message": "Slot not available"}
-
-        # Mark slot as inactive (booked)
-        slot.active = False
+            return {
+                "success": False,
+                "code": "slot_unavailable",
+                "message": "This slot is no longer available, please choose another time.",
+            }
 
-        # Create appointment record
         appointment = self.create({
             "granular_slot_id": slot.id,
             "patient_id": patient.id,
-            "note":note
+            "note": note,
+            "status": "confirmed",
+            "date_confirmed": fields.Datetime.now(),
         })
-        appointment.confirm()
         return {
             "success": True,
             "appointment_id": appointment.id,
             "time": appointment.start_datetime.strftime("%d %b %Y | %I:%M %p"),
             "message": "Appointment booked successfully",
         }
-    
+
     @api.model
     def get_user_appointments(self, patient_id):
-        appointments = self.search([("patient_id", "=", patient_id),("status",'=','confirmed')])
-        result = []
-        for appt in appointments:
-            result.append({
-                "id": appt.id,
-                "date_time": appt.start_datetime.strftime("%d %b %Y | %I:%M %p"),
-                "isCancelled": appt.state == "cancelled",
-                "isCompleted": appt.state == "completed",
+        return self.get_user_appointments_page(patient_id)["appointments"]
+
+    @api.model
+    def get_user_appointments_page(self, patient_id, scope='all', cursor=None, limit=None):
+        """One page of a patient's confirmed appointments.
+
+        ``scope`` is ``all``, ``upcoming`` (soonest first), ``past`` or
+        ``cancelled`` (most recent first). Pages are keyset-paginated on
+        (start_datetime, id): pass the returned ``next_cursor`` to get the
+        following page, which is ``False`` on the last one (XML-RPC cannot
+        marshal ``None``). Only the projected fields are read, provider names
+        in one batch.
+        """
+        now = fields.Datetime.now()
+        domain = [("patient_id", "=", patient_id), ("status", "=", "confirmed"), ("start_datetime", "!=", False)]
+        if scope == 'upcoming':
+            domain += [("start_datetime", ">=", now), ("state", "not in", ("cancelled", "missed"))]
+        elif scope == 'past':
+            domain += [("start_datetime", "<", now), ("state", "!=", "cancelled")]
+        elif scope == 'cancelled':
+            domain += [("state", "=", "cancelled")]
+        elif scope != 'all':
+            raise ValidationError(_("Unknown appointment scope %s.") % scope)
+
+        ascending = scope == 'upcoming'
+        if cursor:
+            after_start, after_id = self._decode_cursor(cursor)
+            op = ">" if ascending else "<"
+            domain += ['|', ("start_datetime", op, after_start),
+                       '&', ("start_datetime", "=", after_start), ("id", op, after_id)]
+        order = "start_datetime asc, id asc" if ascending else "start_datetime desc, id desc"
+        rows = self.search_read(domain, ["start_datetime", "state", "provider_id"], order=order,
+                                limit=limit + 1 if limit else None)
+
+        next_cursor = False
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1]["start_datetime"], rows[-1]["id"])
+        return {
+            "appointments": [{
+                "id": row["id"],
+                "date_time": row["start_datetime"].strftime("%d %b %Y | %I:%M %p"),
+                "isCancelled": row["state"] == "cancelled",
+                "isCompleted": row["state"] == "completed",
                 "doctor": {
-                    "name": appt.provider_id.name,
+                    "name": row["provider_id"][1] if row["provider_id"] else False,
                 }
-            })
-        return result
\ No newline at end of file
+            } for row in rows],
+            "next_cursor": next_cursor,
+        }
+
+    @api.model
+    def _encode_cursor(self, start_datetime, record_id):
+        return base64.urlsafe_b64encode(f"{fields.Datetime.to_string(start_datetime)}|{record_id}".encode()).decode()
+
+    @api.model
+    def _decode_cursor(self, cursor):
+        try:
+            start, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return fields.Datetime.to_datetime(start), int(record_id)
+        except ValueError:
+            raise ValidationError(_("Invalid pagination cursor."))
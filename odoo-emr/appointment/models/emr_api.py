@@ -0,0 +1,44 @@
+from odoo import models, api, _
+from odoo.api import call_kw
+import logging
+_logger = logging.getLogger(__name__)
+
+
+class EMRApi(models.AbstractModel):
+    _name = 'emr.api'
+    _description = 'EMR Gateway API'
+
+    # (model, method) pairs the gateway may bundle into a single batch call
+    _batch_allowed_methods = {
+        ('emr.provider', 'get_doctor_data'),
+        ('emr.provider', 'get_doctor_availability'),
+        ('appointment.appointment', 'get_user_appointments'),
+    }
+    _batch_max_size = 20
+
+    @api.model
+    def batch(self, requests):
+        """Run several named sub-requests in one RPC and one transaction.
+
+        Each request is a dict with ``name``, ``model``, ``method`` and optional
+        ``args``/``kwargs``. Sub-requests run under a savepoint so one failure
+        is reported against its name without discarding the others.
+        """
+        if len(requests) > self._batch_max_size:
+            raise models.ValidationError(_("A batch may contain at most %s requests.") % self._batch_max_size)
+
+        results = {}
+        for request in requests:
+            name = request.get('name')
+            model, method = request.get('model'), request.get('method')
+            if (model, method) not in self._batch_allowed_methods:
+                results[name] = {"success": False, "message": _("%s.%s cannot be batched.") % (model, method)}
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    result = call_kw(self.env[model], method, request.get('args') or [], request.get('kwargs') or {})
+                results[name] = {"success": True, "result": result}
+            except Exception as e:
+                _logger.warning("Batch sub-request %s (%s.%s) failed: %s", name, model, method, e)
+                results[name] = {"success": False, "message": str(e)}
+        return results
@@ -0,0 +1,127 @@
+from odoo import models, fields, api, _
+from datetime import datetime, timedelta
+import logging
+_logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+class ScheduleTemplate(models.Model):
+    _name = 'appointment.schedule.template'
+    _description = 'Provider Schedule Template'
+
+    name = fields.Char(compute='_compute_name', store=True)
+    provider_id = fields.Many2one('emr.provider', string="Provider", required=True)
+    service_type = fields.Many2one('medical.service', string="Clinic Type", required=True, ondelete="cascade",
+                                   domain="[('id', 'in', allowed_service_type_ids)]")
+    allowed_service_type_ids = fields.Many2many('medical.service', related='provider_id.service_ids', string="Allowed Service Types")
+    location_id = fields.Many2one('emr.locations', string="Location", required=True)
+    start_time = fields.Float(string="Start Time (hours)", required=True)
+    end_time = fields.Float(string="End Time (hours)", required=True)
+    duration = fields.Integer(string="Duration (minutes)", required=True, default=20)
+    mon = fields.Boolean(string="Monday", default=True)
+    tue = fields.Boolean(string="Tuesday", default=True)
+    wed = fields.Boolean(string="Wednesday", default=True)
+    thu = fields.Boolean(string="Thursday", default=True)
+    fri = fields.Boolean(string="Friday", default=True)
+    sat = fields.Boolean(string="Saturday")
+    sun = fields.Boolean(string="Sunday")
+    date_start = fields.Date(string="Valid From", required=True, default=fields.Date.context_today)
+    date_end = fields.Date(string="Valid Until")
+    horizon_days = fields.Integer(string="Horizon (days)", default=28, help="How many days ahead time slots are kept generated")
+    timeslot_ids = fields.One2many('appointment.timeslot', 'template_id', string="Generated Time Slots")
+    active = fields.Boolean(default=True)
+
+    @api.depends('provider_id', 'service_type', 'start_time', 'end_time', 'duration', *WEEKDAYS)
+    def _compute_name(self):
+        for rec in self:
+            days = ", ".join(day.capitalize() for day in WEEKDAYS if rec[day])
+            hours = "%02d:%02d-%02d:%02d" % (*divmod(round(rec.start_time * 60), 60), *divmod(round(rec.end_time * 60), 60))
+            rec.name = f"{rec.provider_id.name or ''}, {rec.service_type.name or ''}, {days} {hours}, {rec.duration} min"
+
+    @api.constrains('start_time', 'end_time', 'duration', 'date_start', 'date_end')
+    def _check_schedule(self):
+        for rec in self:
+            if not 0 <= rec.start_time < rec.end_time <= 24:
+                raise models.ValidationError(_("Start time must be before end time, within the same day."))
+            if rec.duration <= 0:
+                raise models.ValidationError(_("Duration must be positive."))
+            if rec.date_end and rec.date_end < rec.date_start:
+                raise models.ValidationError(_("The end date must be after the start date."))
+
+    def _expand(self, today=None):
+        """Materialize the missing days of each template up to its horizon.
+
+        Days that already have a time slot from the template (including
+        archived ones) are skipped, so the expansion is idempotent. Candidate
+        blocks are checked against every existing slot of their providers in
+        the window with one query; conflicting days are logged and skipped.
+        The new blocks are created and confirmed in bulk.
+        """
+        today = today or fields.Date.context_today(self)
+        candidates = []
+        for rec in self.filtered('active'):
+            first = max(today, rec.date_start)
+            last = today + timedelta(days=rec.horizon_days)
+            if rec.date_end:
+                last = min(last, rec.date_end)
+            days = (last - first).days + 1
+            candidates += [(rec, day) for day in (first + timedelta(days=i) for i in range(days)) if rec[WEEKDAYS[day.weekday()]]]
+        if not candidates:
+            return self.env['appointment.timeslot']
+
+        window_start = min(day for _rec, day in candidates)
+        window_end = max(day for _rec, day in candidates)
+        taken, generated = {}, set()
+        for slot in self.env['appointment.timeslot'].with_context(active_test=False).search_read([
+            ('provider_id', 'in', self.provider_id.ids),
+            ('date', '>=', window_start),
+            ('date', '<=', window_end),
+        ], ['provider_id', 'template_id', 'date', 'start_datetime', 'end_datetime', 'active']):
+            if slot['template_id']:
+                generated.add((slot['template_id'][0], slot['date']))
+            if slot['active']:
+                taken.setdefault((slot['provider_id'][0], slot['date']), []).append((slot['start_datetime'], slot['end_datetime']))
+
+        vals_list = []
+        for rec, day in candidates:
+            if (rec.id, day) in generated:
+                continue
+            midnight = datetime.combine(day, datetime.min.time())
+            start, end = midnight + timedelta(hours=rec.start_time), midnight + timedelta(hours=rec.end_time)
+            busy = taken.setdefault((rec.provider_id.id, day), [])
+            if any(s < end and e > start for s, e in busy):
+                _logger.warning("Schedule template %s skipped %s: overlaps an existing time slot", rec.display_name, day)
+                continue
+            busy.append((start, end))
+            vals_list.append({
+                'template_id': rec.id,
+                'date': day,
+                'start_time': rec.start_time,
+                'end_time': rec.end_time,
+                'duration': rec.duration,
+                'provider_id': rec.provider_id.id,
+                'location_id': rec.location_id.id,
+                'service_type': rec.service_type.id,
+                'state': 'posted',
+            })
+        timeslots = self.env['appointment.timeslot'].with_context(tracking_disable=True, mail_create_nolog=True).create(vals_list)
+        timeslots.action_confirm()
+        _logger.info("Schedule templates generated %s time slots", len(timeslots))
+        return timeslots
+
+    def action_generate(self):
+        timeslots = self._expand()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': _("%s time slots generated.") % len(timeslots),
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    @api.model
+    def _cron_expand_schedule_templates(self):
+        self.search([])._expand()
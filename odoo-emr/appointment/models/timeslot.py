@@ -1,6 +1,9 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, modules, _
+from odoo.tools import SQL
+from odoo.tools.sql import constraint_definition
 from datetime import datetime, timedelta
 import logging
+import time
 _logger = logging.getLogger(__name__)
 
 class TimeSlot(models.Model):
@@ -22,11 +25,55 @@ class TimeSlot(models.Model):
     state = fields.Selection([('draft','Draft'),('posted','Posted'),('confirmed','Confirmed')], default='draft')
     # service_type = fields.Many2one('medical.service', string="Clinic Type", required=True, ondelete="cascade", domain="[('id', 'in', provider_id.service_ids.ids)]" if provider_id else [])
     available_slot_ids = fields.One2many('appointment.available.slot', 'slot_id', string="Granular Slots")
+    template_id = fields.Many2one('appointment.schedule.template', string="Schedule Template", ondelete="set null", index="btree_not_null")
     active = fields.Boolean(default=True)
 
     service_type = fields.Many2one('medical.service', string="Clinic Type", required=True, ondelete="cascade",domain="[('id', 'in', allowed_service_type_ids)]")
     allowed_service_type_ids = fields.Many2many('medical.service',compute='_compute_allowed_service_types',string="Allowed Service Types")
 
+    # Overlaps are rejected by Postgres itself, so concurrent scheduling cannot slip two blocks past the check;
+    # the CHECK runs before the exclusion index, which cannot build a range whose bounds are reversed
+    _sql_constraints = [
+        ('check_time_order', 'CHECK (start_datetime < end_datetime)', 'Start time must be before end time.'),
+        ('no_provider_overlap',
+         'EXCLUDE USING gist (provider_id WITH =, tsrange(start_datetime, end_datetime) WITH &&) WHERE (active)',
+         'This time slot overlaps with another slot for the same provider.'),
+    ]
+
+    def _auto_init(self):
+        # btree_gist provides the integer "=" operator class the exclusion constraint needs
+        self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        return super()._auto_init()
+
+    def init(self):
+        # Odoo only logs a warning and skips the exclusion constraint when existing rows already
+        # overlap; name them so they can be fixed and the module updated again
+        if self._has_overlap_constraint():
+            return
+        self.env.cr.execute("""
+            SELECT a.provider_id, a.id, b.id
+              FROM appointment_timeslot a
+              JOIN appointment_timeslot b
+                ON b.provider_id = a.provider_id
+               AND b.id > a.id
+               AND b.active
+               AND b.start_datetime < a.end_datetime
+               AND b.end_datetime > a.start_datetime
+             WHERE a.active
+          ORDER BY a.provider_id, a.id, b.id
+        """)
+        overlaps = self.env.cr.fetchall()
+        if overlaps:
+            _logger.error(
+                "The no_provider_overlap constraint on appointment.timeslot could not be created because %s pairs "
+                "of active time slots overlap (provider, slot, slot): %s. Overlaps are checked in Python until these "
+                "are fixed and the module is updated.",
+                len(overlaps), ", ".join("(%s, %s, %s)" % row for row in overlaps[:50]),
+            )
+
+    def _has_overlap_constraint(self):
+        return bool(constraint_definition(self.env.cr, self._table, f'{self._table}_no_provider_overlap'))
+
     @api.depends('provider_id')
     def _compute_allowed_service_types(self):
         for record in self:
@@ -36,11 +83,29 @@ class TimeSlot(models.Model):
             else:
                 record.allowed_service_type_ids = False
 
-    @api.model
-    def create(self, vals):
-        if vals.get('timeslot_id', _('New')) == _('New'):
-            vals['timeslot_id'] = self.env['ir.sequence'].next_by_code('appointment.timeslot')
-        return super().create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        unnamed = [vals for vals in vals_list if vals.get('timeslot_id', _('New')) == _('New')]
+        names = self.env['ir.sequence'].next_batch_by_code('appointment.timeslot', len(unnamed))
+        for vals, name in zip(unnamed, names):
+            vals['timeslot_id'] = name
+        records = super().create(vals_list)
+        self.env['emr.cache.bus'].publish(records._cache_events())
+        return records
+
+    def write(self, vals):
+        events = self._cache_events()
+        providers = self.provider_id
+        res = super().write(vals)
+        self.env['emr.cache.bus'].publish(events + self._cache_events())
+        if 'provider_id' in vals:
+            # The granular slots follow the block to its new provider
+            (providers | self.provider_id)._refresh_availability()
+        return res
+
+    def _cache_events(self):
+        bus = self.env['emr.cache.bus']
+        return [bus.availability_event(rec.provider_id, rec.service_type) for rec in self if rec.provider_id and rec.service_type]
 
     @api.depends('date', 'start_time', 'end_time')
     def _compute_datetimes(self):
@@ -58,49 +123,53 @@ class TimeSlot(models.Model):
             if rec.date and rec.date < datetime.today().date():
                 raise models.ValidationError(_("The appointment date must be today or a future date."))
 
-    @api.constrains('start_datetime', 'end_datetime', 'provider_id')
+    @api.constrains('start_datetime', 'end_datetime', 'provider_id', 'active')
     def _check_time_slot(self):
-        for rec in self:
-            if rec.start_datetime and rec.end_datetime and rec.start_datetime >= rec.end_datetime:
-                raise models.ValidationError(_("Start time must be before end time."))
-
-            overlapping = self.search([
-                ('id', '!=', rec.id),
-                ('provider_id', '=', rec.provider_id.id),
-                ('start_datetime', '<', rec.end_datetime),
-                ('end_datetime', '>', rec.start_datetime),
-            ])
-            if overlapping:
-                raise models.ValidationError(_("This time slot overlaps with another slot for the same provider."))
+        # Fallback for databases where overlapping rows kept the exclusion constraint from being created
+        if self._has_overlap_constraint():
+            return
+        self.flush_model(['provider_id', 'start_datetime', 'end_datetime', 'active'])
+        self.env.cr.execute("""
+            SELECT a.id
+              FROM appointment_timeslot a
+              JOIN appointment_timeslot b
+                ON b.provider_id = a.provider_id
+               AND b.id != a.id
+               AND b.active
+               AND b.start_datetime < a.end_datetime
+               AND b.end_datetime > a.start_datetime
+             WHERE a.id IN %s AND a.active
+             LIMIT 1
+        """, [tuple(self.ids)])
+        if self.env.cr.fetchone():
+            raise models.ValidationError(_("This time slot overlaps with another slot for the same provider."))
 
     def generate_granular_slots(self):
-        """Generates non-overlapping granular slots within this time slot."""
+        """Generate the non-overlapping granular slots of every block in ``self`` in one batch.
+
+        Sub-slots are computed in memory, existing slots of the blocks are read
+        with one query to skip overlaps, slot numbers are reserved in bulk and
+        everything is inserted with a single ``create``.
+        """
         self.available_slot_ids.unlink()
-        start = self.start_datetime
-        end = self.end_datetime
-        duration = self.duration or 20
-
-        while start < end:
-            slot_end = start + timedelta(minutes=duration)
-            if slot_end > end:
-                break  # avoid creating partial slots beyond the end
-            # Check overlap with existing slots
-            overlapping = self.env['appointment.available.slot'].search([
-                ('slot_id', '=', self.id),
-                ('start_datetime', '<', slot_end),
-                ('end_datetime', '>', start)
-            ])
-            if not overlapping:
-                self.env['appointment.available.slot'].create({
-                    'slot_id': self.id,
-                    'start_datetime': start,
-                    'end_datetime': slot_end,
-                    'duration':self.duration,
-                    'provider_id': self.provider_id.id,
-                    'location_id': self.location_id.id,
-                    'service_type': self.service_type.id
-                })
-            start = slot_end
+        existing = {}
+        for slot in self.env['appointment.available.slot'].search_read(
+                [('slot_id', 'in', self.ids)], ['slot_id', 'start_datetime', 'end_datetime']):
+            existing.setdefault(slot['slot_id'][0], []).append((slot['start_datetime'], slot['end_datetime']))
+
+        vals_list = []
+        for rec in self.filtered(lambda r: r.start_datetime and r.end_datetime):
+            step = timedelta(minutes=rec.duration or 20)
+            # Only whole steps fit: partial slots past the end of the block are never created
+            count = int((rec.end_datetime - rec.start_datetime) / step)
+            taken = existing.get(rec.id, [])
+            for i in range(count):
+                start = rec.start_datetime + i * step
+                end = start + step
+                if any(s < end and e > start for s, e in taken):
+                    continue
+                vals_list.append({'slot_id': rec.id, 'start_datetime': start, 'end_datetime': end})
+        return self.env['appointment.available.slot'].create(vals_list)
 
     def action_post(self):
         for rec in self:
@@ -110,9 +179,8 @@ class TimeSlot(models.Model):
             rec.state = 'posted'
 
     def action_confirm(self):
-        for rec in self:
-            rec.state = 'confirmed'
-            rec.generate_granular_slots()
+        self.state = 'confirmed'
+        self.generate_granular_slots()
 
     def action_reset(self):
         for rec in self:
@@ -126,7 +194,12 @@ class TimeSlot(models.Model):
             booked_children = slot.available_slot_ids.filtered(lambda s: s.is_booked)
             if booked_children:
                 raise models.ValidationError(_("Cannot delete this time slot because some granular slots are already booked."))
-        return super(TimeSlot, self).unlink()
+        self.env['emr.cache.bus'].publish(self._cache_events())
+        providers = self.provider_id
+        res = super(TimeSlot, self).unlink()
+        # Granular slots go with the block through ON DELETE CASCADE, bypassing their own unlink
+        providers._refresh_availability()
+        return res
 
     @api.onchange('provider_id')
     def _onchange_provider_id(self):
@@ -146,17 +219,80 @@ class AppointmentAvailableSlot(models.Model):
     start_time = fields.Float(compute="_compute_times", store=True)
     duration = fields.Integer(string="Duration (minutes)", help="Duration of the appointment in minutes", related="slot_id.duration")
     end_time = fields.Float(compute="_compute_times", store=True)
-    provider_id = fields.Many2one("emr.provider", string="Provider", readonly=False, related="slot_id.provider_id")
-    location_id = fields.Many2one("emr.locations", string="Location", readonly=False, related="slot_id.location_id")
-    service_type = fields.Many2one("medical.service", string="Clinic Type", readonly=False, related="slot_id.service_type")
+    # Stored so availability reads filter on the slot table alone instead of joining through the block
+    provider_id = fields.Many2one("emr.provider", string="Provider", readonly=False, related="slot_id.provider_id", store=True)
+    location_id = fields.Many2one("emr.locations", string="Location", readonly=False, related="slot_id.location_id", store=True)
+    service_type = fields.Many2one("medical.service", string="Clinic Type", readonly=False, related="slot_id.service_type", store=True)
     is_booked = fields.Boolean(default=False)
     active = fields.Boolean(default=True)
 
+    _purge_batch_size = 5000
+    _purge_time_budget = 120  # seconds per cron run
+
+    def init(self):
+        # Covers the availability read: the free slots of one provider and clinic type, in time order
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS appointment_available_slot_free_idx
+                ON appointment_available_slot (provider_id, service_type, start_datetime)
+             WHERE active AND NOT is_booked
+        """)
+        # Lets the retention purge find expired history without scanning live slots
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS appointment_available_slot_expired_idx
+                ON appointment_available_slot (end_datetime)
+             WHERE NOT active AND NOT is_booked
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        unnamed = [vals for vals in vals_list if vals.get('available_slot_id', _('New')) == _('New')]
+        names = self.env['ir.sequence'].next_batch_by_code('appointment.available.slot', len(unnamed))
+        for vals, name in zip(unnamed, names):
+            vals['available_slot_id'] = name
+        records = super().create(vals_list)
+        self.env['emr.cache.bus'].publish(records._cache_events())
+        records.provider_id._refresh_availability()
+        return records
+
+    def write(self, vals):
+        # Booking, cancelling and archiving all land here, so the gateway hears about each of them
+        providers = self.provider_id
+        res = super().write(vals)
+        self.env['emr.cache.bus'].publish(self._cache_events())
+        if {'is_booked', 'active', 'slot_id'} & vals.keys():
+            (providers | self.provider_id)._refresh_availability()
+        return res
+
+    def unlink(self):
+        self.env['emr.cache.bus'].publish(self._cache_events())
+        providers = self.provider_id
+        res = super().unlink()
+        providers._refresh_availability()
+        return res
+
+    def _cache_events(self):
+        bus = self.env['emr.cache.bus']
+        return [bus.availability_event(rec.provider_id, rec.service_type) for rec in self if rec.provider_id and rec.service_type]
+
     @api.model
-    def create(self, vals):
-        if vals.get('available_slot_id', _('New')) == _('New'):
-            vals['available_slot_id'] = self.env['ir.sequence'].next_by_code('appointment.available.slot')
-        return super().create(vals)
+    def _claim(self, slot_id):
+        """Lock a free slot and mark it booked; returns an empty recordset if it is already taken.
+
+        SKIP LOCKED makes a slot that another transaction is booking right now
+        look taken instead of queueing behind that transaction's lock.
+        """
+        self.flush_model(['is_booked', 'active'])
+        self.env.cr.execute("""
+            SELECT id FROM appointment_available_slot
+             WHERE id = %s AND NOT is_booked AND active
+               FOR UPDATE SKIP LOCKED
+        """, [slot_id])
+        row = self.env.cr.fetchone()
+        if not row:
+            return self.browse()
+        slot = self.browse(row[0])
+        slot.write({'is_booked': True, 'active': False})
+        return slot
     
     def _get_display_name(self):
         result = {}
@@ -190,6 +326,47 @@ class AppointmentAvailableSlot(models.Model):
             ('active', '=', True),
         ])
         expired_slots.action_archive()
+        self._purge_expired_slots()
+
+    def _purge_expired_slots(self):
+        """Hard-delete archived, unbooked slots older than the retention window.
+
+        The window is the ``appointment.slot_retention_days`` system parameter
+        (90 days by default, 0 disables purging). Slots an appointment still
+        points to are kept as its history. Rows are deleted in chunks, each
+        committed, within ``_purge_time_budget`` seconds; the rest waits for
+        the next run.
+        """
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param('appointment.slot_retention_days', 90))
+        if retention_days <= 0:
+            return 0
+        cutoff = fields.Datetime.now() - timedelta(days=retention_days)
+        deadline = time.monotonic() + self._purge_time_budget
+        self.env['appointment.appointment'].flush_model(['granular_slot_id'])
+        self.flush_model(['active', 'is_booked', 'end_datetime'])
+        purged = 0
+        while time.monotonic() < deadline:
+            self.env.cr.execute("""
+                DELETE FROM appointment_available_slot
+                 WHERE id IN (
+                        SELECT s.id
+                          FROM appointment_available_slot s
+                         WHERE NOT s.active
+                           AND NOT s.is_booked
+                           AND s.end_datetime < %s
+                           AND NOT EXISTS (SELECT 1 FROM appointment_appointment a WHERE a.granular_slot_id = s.id)
+                         LIMIT %s
+                       )
+            """, [cutoff, self._purge_batch_size])
+            purged += self.env.cr.rowcount
+            if self.env.cr.rowcount < self._purge_batch_size:
+                break
+            if not modules.module.current_test:
+                self.env.cr.commit()
+        if purged:
+            self.invalidate_model()
+            _logger.info("Purged %s expired granular slots older than %s days", purged, retention_days)
+        return purged
 
 
 
@@ -201,54 +378,102 @@ class EMRProvider(models.Model):
         help="True if the provider has active available time slots"
     )
 
+    def _refresh_availability(self):
+        """Recompute ``is_available`` for these providers with one grouped count.
+
+        Only providers whose flag actually flips are written, so booking one
+        of many free slots does not touch the provider row at all. Runs as
+        superuser: the slot change may come from a patient booking, and
+        patients cannot write providers.
+        """
+        if not self:
+            return
+        providers = self.sudo()
+        groups = providers.env["appointment.available.slot"]._read_group([
+            ("provider_id", "in", providers.ids),
+            ("active", "=", True),
+            ("is_booked", "=", False),
+        ], ["provider_id"], ["__count"])
+        available = {provider.id for provider, _count in groups}
+        providers.filtered(lambda p: not p.is_available and p.id in available).write({'is_available': True})
+        providers.filtered(lambda p: p.is_available and p.id not in available).write({'is_available': False})
+
     def update_provider_availability(self):
-        providers = self.search([])
-        for provider in providers:
-            active_slot = self.env["appointment.available.slot"].search_count([
-                ("provider_id", "=", provider.id),
-                ("active", "=", True),
-                ('is_booked','=',False)
-            ], limit=1)
-            provider.is_available = bool(active_slot)
-
-    def get_doctor_data(self):
-        doctors = []
-        for provider in self.search([('active', '=', True)]):
-            speciality_names = ", ".join(provider.specialty_ids.mapped("name"))
-            for service in provider.service_ids:
-                doctors.append({
-                    "id": provider.id,
-                    "name": provider.name,
-                    "speciality": speciality_names,
-                    "about": provider.license_number or "",
-                    "clinic_type": service.name,
-                    "clinic_type_slug": service.slug,
-                    "is_available": provider.is_available
-                })
-        return doctors
-    
+        # Slot changes keep the flag current, but two concurrent bookings of a provider's last free
+        # slots each still see the other one free under REPEATABLE READ; this sweep repairs that drift
+        self.search([])._refresh_availability()
+
+    def get_doctor_data(self, clinic_type_slug=None, available_only=False, limit=None, offset=0):
+        """One row per (active provider, clinic type) for the patient directory.
+
+        Providers, their clinic types and comma-joined specialties are read
+        with a single SQL query; the portal can filter by clinic type slug or
+        to available providers only, and page through the result.
+        """
+        services = self._fields['service_ids']
+        specialties = self._fields['specialty_ids']
+        conditions = [SQL("p.active"), SQL("s.active")]
+        if clinic_type_slug:
+            conditions.append(SQL("s.slug = %s", clinic_type_slug))
+        if available_only:
+            conditions.append(SQL("p.is_available"))
+        self.flush_model(['name', 'license_number', 'is_available', 'active', 'service_ids', 'specialty_ids'])
+        self.env['medical.service'].flush_model(['name', 'slug', 'active'])
+        self.env['provider.specialty'].flush_model(['name', 'active'])
+        self.env.cr.execute(SQL("""
+            SELECT p.id, p.name,
+                   COALESCE(spec.names, '') AS speciality,
+                   COALESCE(p.license_number, '') AS about,
+                   s.name AS clinic_type,
+                   s.slug AS clinic_type_slug,
+                   COALESCE(p.is_available, FALSE) AS is_available
+              FROM emr_provider p
+              JOIN %(service_rel)s sr ON sr.%(service_provider_col)s = p.id
+              JOIN medical_service s ON s.id = sr.%(service_col)s
+         LEFT JOIN LATERAL (
+                    SELECT string_agg(ps.name, ', ' ORDER BY ps.id) AS names
+                      FROM %(specialty_rel)s pr
+                      JOIN provider_specialty ps ON ps.id = pr.%(specialty_col)s AND ps.active
+                     WHERE pr.%(specialty_provider_col)s = p.id
+                   ) spec ON TRUE
+             WHERE %(where)s
+          ORDER BY p.id, s.id
+             LIMIT %(limit)s OFFSET %(offset)s
+        """,
+            service_rel=SQL.identifier(services.relation),
+            service_provider_col=SQL.identifier(services.column1),
+            service_col=SQL.identifier(services.column2),
+            specialty_rel=SQL.identifier(specialties.relation),
+            specialty_provider_col=SQL.identifier(specialties.column1),
+            specialty_col=SQL.identifier(specialties.column2),
+            where=SQL(" AND ").join(conditions),
+            limit=limit,
+            offset=offset or 0,
+        ))
+        return self.env.cr.dictfetchall()
 
     def get_availability(self, clinic_type_slug):
-        availability = []
-        clinic_type = self.env['medical.service'].search([('slug','=',clinic_type_slug)])
-        slots = self.env["appointment.available.slot"].search([
-            ("provider_id", "=", self.id),
-            ("service_type",'=', clinic_type.id),
-            ("is_booked",'=',False),
-            ("active", "=", True)
-        ])
-        slots_by_date = {}
-        for slot in slots:
-            slot_date = slot.start_datetime.date().isoformat()
-            slot_time = slot.start_datetime.strftime("%H:%M")
-            slots_by_date.setdefault(slot_date, []).append({'id':slot.id,'time':slot_time})
-
-        for date, times in slots_by_date.items():
-            availability.append({
-                
-                "date": date,
-                "slots": times
-            })
+        """Free slots of this provider for one clinic type, grouped by date.
+
+        Dates and their slots are aggregated by Postgres in a single query
+        over the partial free-slot index, already in the shape the gateway serves.
+        """
+        clinic_type = self.env['medical.service'].search([('slug','=',clinic_type_slug)], limit=1)
+        Slot = self.env["appointment.available.slot"]
+        Slot.flush_model(['provider_id', 'service_type', 'start_datetime', 'is_booked', 'active'])
+        self.env.cr.execute("""
+            SELECT day AS date, json_agg(json_build_object('id', id, 'time', time) ORDER BY start_datetime) AS slots
+              FROM (
+                    SELECT id, start_datetime,
+                           to_char(start_datetime, 'YYYY-MM-DD') AS day,
+                           to_char(start_datetime, 'HH24:MI') AS time
+                      FROM appointment_available_slot
+                     WHERE provider_id = %s AND service_type = %s AND active AND NOT is_booked
+                   ) free
+          GROUP BY day
+          ORDER BY day
+        """, [self.id, clinic_type.id or None])
+        availability = self.env.cr.dictfetchall()
 
         return {
             "name": self.name,
@@ -1 +1 @@
-from . import locations, users, university_info, medical_conditions, medical_allergen, medical_reactions, medical_immunization, provider_specialty, medical_services, encounter_type
\ No newline at end of file
+from . import locations, users, university_info, medical_conditions, medical_allergen, medical_reactions, medical_immunization, provider_specialty, medical_services, encounter_type, cache_bus, sequence
\ No newline at end of file
@@ -0,0 +1,67 @@
+from odoo import models, api
+import json
+import logging
+_logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+CHANNEL = 'emr:cache-invalidation'
+# Version of the gateway's shared doctor directory cache, bumped once per change
+DOCTOR_LIST_VERSION_KEY = 'doctor_list:version'
+_clients = {}
+
+
+def _get_client(url):
+    if url not in _clients:
+        _clients[url] = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+    return _clients[url]
+
+
+def _publish(url, events):
+    # Runs after commit: the gateway must never refetch data that is not visible yet
+    unique = list({json.dumps(event, sort_keys=True): event for event in events}.values())
+    try:
+        client = _get_client(url)
+        if any(event.get("type") == "doctor_list" for event in unique):
+            # Bumped here rather than by each gateway worker receiving the event, so one change is one new version
+            version = client.incr(DOCTOR_LIST_VERSION_KEY)
+            unique = [dict(event, version=version) if event.get("type") == "doctor_list" else event for event in unique]
+        client.publish(CHANNEL, json.dumps({"events": unique}))
+    except Exception as e:
+        _logger.warning("Could not publish %s cache invalidation events: %s", len(unique), e)
+
+
+class EMRCacheBus(models.AbstractModel):
+    _name = 'emr.cache.bus'
+    _description = 'Gateway Cache Invalidation Bus'
+
+    @api.model
+    def publish(self, events):
+        """Queue cache invalidation events for the FastAPI gateway.
+
+        Events are collected for the whole transaction and published once on
+        commit to the Redis channel ``emr:cache-invalidation``. Publishing is
+        disabled unless the ``emr.redis_url`` system parameter is set and the
+        ``redis`` package is installed.
+        """
+        if not events or redis is None:
+            return
+        url = self.env['ir.config_parameter'].sudo().get_param('emr.redis_url')
+        if not url:
+            return
+        data = self.env.cr.postcommit.data
+        if 'emr.cache.bus' not in data:
+            data['emr.cache.bus'] = queued = []
+            self.env.cr.postcommit.add(lambda: _publish(url, queued))
+        data['emr.cache.bus'].extend(events)
+
+    @api.model
+    def doctor_list_event(self):
+        return {"type": "doctor_list"}
+
+    @api.model
+    def availability_event(self, provider, service):
+        return {"type": "availability", "doctor_id": provider.id, "clinic_type": service.slug}
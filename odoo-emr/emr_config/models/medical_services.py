@@ -10,7 +10,7 @@ class MedicalService(models.Model):
 
     name = fields.Char(string="Service Name", required=True, help="Name of the medical service, e.g. 'Antenatal Care'")
     description = fields.Text(string="Description", help="Detailed description of the service")
-    slug = fields.Char("Slug", compute="_compute_slug", store=True)
+    slug = fields.Char("Slug", compute="_compute_slug", store=True, index=True)
     active = fields.Boolean(string="Active", default=True, help="Indicates if the service is currently active")
     _sql_constraints = [
         ('uniq_name', 'unique(name)', 'Service Name must be unique!'),
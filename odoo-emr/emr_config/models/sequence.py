@@ -0,0 +1,22 @@
+from odoo import models, api
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    @api.model
+    def next_batch_by_code(self, sequence_code, count):
+        """Reserve ``count`` consecutive values of a sequence in one query.
+
+        Standard sequences are backed by a PostgreSQL sequence, so all numbers
+        are drawn with a single ``nextval`` over ``generate_series``. No-gap and
+        date-range sequences fall back to ``next_by_code`` for each value.
+        """
+        if count <= 0:
+            return []
+        sequence = self.sudo().search([('code', '=', sequence_code), ('company_id', 'in', [self.env.company.id, False])],
+                                      order='company_id', limit=1)
+        if not sequence or sequence.implementation != 'standard' or sequence.use_date_range:
+            return [self.next_by_code(sequence_code) for _ in range(count)]
+        self.env.cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)", ('ir_sequence_%03d' % sequence.id, count))
+        return [sequence.get_next_char(number) for number, in self.env.cr.fetchall()]
@@ -1,8 +1,40 @@
 from odoo import models, fields, api
+from datetime import timedelta
 import random
 import logging
 _logger = logging.getLogger(__name__)
 
+GATEWAY_API_KEY_NAME = 'EMR Gateway'
+
+
+class ResUsers(models.Model):
+    _inherit = 'res.users'
+
+    def get_or_create_api_key(self, scope='rpc', lifetime_days=1):
+        """Issue a fresh API key the patient gateway can use instead of the password.
+
+        Keys are only stored hashed, so an existing one can never be read back;
+        the user's previous gateway keys are revoked and a new one returned.
+        """
+        self.ensure_one()
+        if self != self.env.user:
+            raise models.AccessError("Users can only issue API keys for themselves.")
+        self.revoke_gateway_api_keys()
+        expiration = fields.Datetime.now() + timedelta(days=lifetime_days)
+        return self.env['res.users.apikeys']._generate(scope, GATEWAY_API_KEY_NAME, expiration)
+
+    def revoke_gateway_api_keys(self):
+        self.ensure_one()
+        if self != self.env.user:
+            raise models.AccessError("Users can only revoke their own API keys.")
+        keys = self.env['res.users.apikeys'].sudo().search([
+            ('user_id', '=', self.id),
+            ('name', '=', GATEWAY_API_KEY_NAME),
+        ])
+        keys.unlink()
+        return True
+
+
 
 class EMRProvider(models.Model):
     _name = 'emr.provider'
@@ -56,31 +88,32 @@ class EMRProvider(models.Model):
                 'partner_id': rec.partner_id.id,
                 'groups_id': [(6, 0, [group_id])],
             })
+        self.env['emr.cache.bus'].publish(rec._cache_events())
         return rec
 
     def write(self, vals):
+        # Services may be removed by this write, so collect their keys beforehand too
+        events = self._cache_events()
         res = super().write(vals)
-        for rec in self:
-            rec.partner_id.write({
-                'name': rec.name,
-                'email': rec.email,
-                'phone': rec.phone,
-            })
-        return res
-    
-    def get_doctor_data(self):
-        doctors = []
-        for provider in self.search([('active', '=', True)]):
-            speciality_names = ", ".join(provider.specialty_ids.mapped("name"))
-            for service in provider.service_ids:
-                doctors.append({
-                    "_id": provider.id,
-                    "name": provider.name,
-                    "speciality": speciality_names,
-                    "about": provider.about or "",
-                    "clinic_type": service.name,
-                    "clinic_type_slug": service.slug
+        # Flag updates such as is_available leave the contact details, and so the partner, untouched
+        if {'first_name', 'last_name', 'email', 'phone'} & vals.keys():
+            for rec in self:
+                rec.partner_id.write({
+                    'name': rec.name,
+                    'email': rec.email,
+                    'phone': rec.phone,
                 })
-        return doctors
-    
+        self.env['emr.cache.bus'].publish(events + self._cache_events())
+        return res
+
+    def unlink(self):
+        self.env['emr.cache.bus'].publish(self._cache_events())
+        return super().unlink()
 
+    def _cache_events(self):
+        """Gateway cache entries that embed this provider's data."""
+        bus = self.env['emr.cache.bus']
+        events = [bus.doctor_list_event()] if self else []
+        for rec in self:
+            events += [bus.availability_event(rec, service) for service in rec.service_ids]
+        return events
@@ -14,6 +14,7 @@ This module is designed to manage patient records efficiently. It allows for the
         'security/user_groups.xml',
         'data/patient_sequence.xml',
         'data/patient_immunization.xml',
+        'data/cron.xml',
         'views/patient_vitals.xml',
         'views/patient_biometrics.xml',
         'views/patient_conditions.xml',
@@ -21,6 +22,7 @@ This module is designed to manage patient records efficiently. It allows for the
         'views/patient_immunization.xml',
         'views/patient_forms.xml',
         'views/patient_record.xml',
+        'views/patient_import.xml',
         'views/menu.xml',
     ],
     'images': ['static/description/icon.png'],
@@ -1 +1 @@
-from . import patient_record, patient_demographic, patient_vitals, patient_biometrics, patient_conditions, patient_allergies, patient_immunization, patient_forms
\ No newline at end of file
+from . import patient_timeseries, patient_record, patient_demographic, patient_vitals, patient_biometrics, patient_conditions, patient_allergies, patient_immunization, patient_forms, patient_observation, patient_import
@@ -2,8 +2,9 @@ from odoo import models, fields, api, _
 
 class PatientBiometrics(models.Model):
     _name="patient.biometrics"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'patient.timeseries.mixin']
     _order = 'recorded_at desc'
+    _rollup_trigger_fields = {'patient_id', 'recorded_at', 'weight', 'height'}
     _description="Patient Biometrics"
 
     patient_id = fields.Many2one('patient.record', string="Patient", required=True)
@@ -14,6 +15,13 @@ class PatientBiometrics(models.Model):
     recorded_at = fields.Datetime(string="Recorded At", default=fields.Datetime.now)
     recorded_label = fields.Char(compute='_compute_recorded_label', store=True)
 
+    def init(self):
+        # Same ordering as the latest-observation query
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS patient_biometrics_latest_idx
+                ON patient_biometrics (patient_id, recorded_at DESC NULLS LAST, id DESC)
+        """)
+
     @api.constrains('weight', 'height')
     def _check_biometrics(self):
         for rec in self:
@@ -97,11 +97,12 @@ class PatientDemographic(models.Model):
             if rec.member_type == 'staff' and rec.student_demographic_id:
                 raise models.ValidationError("Staff cannot have student demographic data.")
     
-    @api.model
-    def create(self, vals):
-        if not vals.get('name'):
-            vals['name'] = f"{vals.get('first_name', '')} {vals.get('last_name', '')}".strip() or 'Unnamed'
-        partner_vals = {
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if not vals.get('name'):
+                vals['name'] = f"{vals.get('first_name', '')} {vals.get('last_name', '')}".strip() or 'Unnamed'
+        partners = self.env['res.partner'].create([{
             'name': vals.get('name', 'Unnamed'),
             'email': vals.get('email'),
             'phone': vals.get('phone'),
@@ -112,11 +113,10 @@ class PatientDemographic(models.Model):
             'country_id': vals.get('country_id'),
             'zip': vals.get('zip'),
             'mobile': vals.get('mobile'),
-        }
-        partner_id = self.env['res.partner'].create(partner_vals)
-        vals['partner_id'] = partner_id.id
-        record = super(PatientDemographic, self).create(vals)
-        return record
+        } for vals in vals_list])
+        for vals, partner in zip(vals_list, partners):
+            vals['partner_id'] = partner.id
+        return super(PatientDemographic, self).create(vals_list)
 
     def write(self, vals):
         if 'name' in vals:
@@ -0,0 +1,342 @@
+from odoo import models, fields, api, modules, Command, _
+from datetime import date, datetime
+import base64
+import csv
+import io
+import re
+import time
+import logging
+_logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+EMAIL_PATTERN = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y']
+
+# Columns copied as-is onto patient.record, by member type
+COMMON_COLUMNS = ['first_name', 'last_name', 'other_name', 'email', 'phone', 'next_of_kin_name', 'next_of_kin_phone']
+MEMBER_COLUMNS = {
+    'student': ['matric_number'],
+    'staff': ['staff_number', 'designation'],
+}
+# Selection columns, matched on either the key or the label
+SELECTION_COLUMNS = {
+    'common': ['gender', 'marital_status', 'next_of_kin_relationship'],
+    'student': ['level'],
+    'staff': ['employment_type'],
+}
+
+
+class PatientImport(models.Model):
+    _name = 'patient.import'
+    _description = 'Patient Bulk Import'
+    _order = 'create_date desc'
+
+    name = fields.Char(required=True, default=lambda self: _("Import of %s") % fields.Date.context_today(self))
+    file = fields.Binary(string="File", required=True, attachment=True, help="CSV or XLSX file with a header row")
+    filename = fields.Char()
+    member_type = fields.Selection([('student', 'Student'), ('staff', 'Staff')], string="Member Type", required=True, default='student')
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('validated', 'Validated'),
+        ('running', 'Importing'),
+        ('failed', 'Failed'),
+        ('done', 'Done'),
+    ], default='draft', required=True, readonly=True)
+    batch_size = fields.Integer(string="Batch Size", default=500, help="Patients created per transaction")
+    rows = fields.Json(readonly=True, copy=False, help="Validated rows waiting to be imported")
+    next_row = fields.Integer(readonly=True, copy=False, help="Position in the validated rows the import resumes from")
+    total_count = fields.Integer(string="Rows", readonly=True, copy=False)
+    valid_count = fields.Integer(string="Valid Rows", readonly=True, copy=False)
+    imported_count = fields.Integer(string="Imported", readonly=True, copy=False)
+    error_count = fields.Integer(string="Errors", compute='_compute_error_count', store=True)
+    progress = fields.Float(compute='_compute_progress')
+    error_ids = fields.One2many('patient.import.error', 'import_id', string="Errors", readonly=True, copy=False)
+    last_error = fields.Text(string="Failure", readonly=True, copy=False)
+
+    # Stop processing after this many seconds so a cron run never outlives its worker
+    _import_time_budget = 240
+
+    @api.depends('error_ids')
+    def _compute_error_count(self):
+        for rec in self:
+            rec.error_count = len(rec.error_ids)
+
+    @api.depends('next_row', 'valid_count')
+    def _compute_progress(self):
+        for rec in self:
+            rec.progress = 100.0 * rec.next_row / rec.valid_count if rec.valid_count else 0.0
+
+    def _read_rows(self):
+        """Yield ``(row_number, {column: value})`` from the uploaded file, one row at a time.
+
+        Row numbers are the spreadsheet's, so the header is row 1. Column
+        names are matched case-insensitively, with spaces read as underscores.
+        """
+        self.ensure_one()
+        content = io.BytesIO(base64.b64decode(self.file))
+        if (self.filename or '').lower().endswith('.xlsx'):
+            if openpyxl is None:
+                raise models.UserError(_("Reading XLSX files requires the openpyxl Python package; upload a CSV instead."))
+            sheet = openpyxl.load_workbook(content, read_only=True, data_only=True).active
+            rows = sheet.iter_rows(values_only=True)
+        else:
+            rows = csv.reader(io.TextIOWrapper(content, encoding='utf-8-sig'))
+        header = next(rows, None)
+        if not header:
+            raise models.UserError(_("The file is empty."))
+        columns = [str(column or '').strip().lower().replace(' ', '_') for column in header]
+        for number, row in enumerate(rows, start=2):
+            if any(cell not in (None, '') for cell in row):
+                yield number, dict(zip(columns, row))
+
+    @api.model
+    def _cell(self, value):
+        # Spreadsheets turn matric numbers and phone numbers into floats
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, (datetime, date)):
+            return value
+        return str(value).strip() if value is not None else ''
+
+    def _lookups(self):
+        """Selection options and faculty/department ids, fetched once per validation."""
+        Patient = self.env['patient.record']
+        selections = {}
+        for fname in SELECTION_COLUMNS['common'] + SELECTION_COLUMNS[self.member_type]:
+            options = {}
+            for key, label in Patient._fields[fname]._description_selection(self.env):
+                options[key.lower()] = options[str(label).lower()] = key
+            selections[fname] = options
+        faculties = {}
+        for faculty in self.env['university.faculties'].search_read([], ['name', 'code']):
+            faculties[faculty['name'].lower()] = faculties[faculty['code'].lower()] = faculty['id']
+        departments = {}
+        for department in self.env['university.departments'].search_read([], ['name', 'code', 'faculty']):
+            value = (department['id'], department['faculty'][0])
+            departments[department['name'].lower()] = departments[department['code'].lower()] = value
+        return selections, faculties, departments
+
+    def _row_values(self, row, selections, faculties, departments):
+        """Patient values of one row, raising ValueError with a readable message on bad data."""
+        cells = {column: self._cell(value) for column, value in row.items()}
+        vals = {'member_type': self.member_type}
+        for column in COMMON_COLUMNS + MEMBER_COLUMNS[self.member_type]:
+            if cells.get(column):
+                vals[column] = str(cells[column])
+        required = ['first_name', 'last_name', 'email', 'gender'] + MEMBER_COLUMNS[self.member_type][:1]
+        missing = [column for column in required if not cells.get(column)]
+        if missing:
+            raise ValueError(_("Missing %s.") % ", ".join(missing))
+        vals['email'] = vals['email'].lower()
+        if not EMAIL_PATTERN.fullmatch(vals['email']):
+            raise ValueError(_("Invalid email %s.") % vals['email'])
+
+        for fname, options in selections.items():
+            value = str(cells.get(fname) or '').lower()
+            if value:
+                if value not in options:
+                    raise ValueError(_("Invalid %s %s.") % (fname, cells[fname]))
+                vals[fname] = options[value]
+
+        dob = cells.get('date_of_birth')
+        if dob:
+            if isinstance(dob, datetime):
+                dob = dob.date()
+            elif not isinstance(dob, date):
+                for date_format in DATE_FORMATS:
+                    try:
+                        dob = datetime.strptime(dob, date_format).date()
+                        break
+                    except ValueError:
+                        continue
+                else:
+                    raise ValueError(_("Invalid date of birth %s.") % dob)
+            vals['date_of_birth'] = fields.Date.to_string(dob)
+
+        if self.member_type == 'student':
+            if cells.get('department'):
+                department = departments.get(str(cells['department']).lower())
+                if not department:
+                    raise ValueError(_("Unknown department %s.") % cells['department'])
+                vals['department_id'], vals['faculty_id'] = department
+            if cells.get('faculty'):
+                faculty_id = faculties.get(str(cells['faculty']).lower())
+                if not faculty_id:
+                    raise ValueError(_("Unknown faculty %s.") % cells['faculty'])
+                if vals.get('faculty_id', faculty_id) != faculty_id:
+                    raise ValueError(_("Department %s is not in faculty %s.") % (cells['department'], cells['faculty']))
+                vals['faculty_id'] = faculty_id
+        return vals
+
+    def action_validate(self):
+        """Check the whole file before anything is created.
+
+        Every row is parsed and validated, duplicates are looked for inside
+        the file and, with one query per unique key, against existing
+        students, staff, patients and user logins. Rejected rows are listed
+        on the import; the valid ones are kept for the background import.
+        """
+        for rec in self:
+            if rec.state not in ('draft', 'validated'):
+                raise models.UserError(_("Only imports that have not started can be validated."))
+            selections, faculties, departments = rec._lookups()
+            key = MEMBER_COLUMNS[rec.member_type][0]
+            rows, errors, seen = [], [], {}
+            total = 0
+            for number, row in rec._read_rows():
+                total += 1
+                try:
+                    vals = rec._row_values(row, selections, faculties, departments)
+                    for column in ('email', key):
+                        if (column, vals[column]) in seen:
+                            raise ValueError(_("Duplicate %s %s, also on row %s.") % (column, vals[column], seen[column, vals[column]]))
+                    seen.update({('email', vals['email']): number, (key, vals[key]): number})
+                    rows.append({'row': number, 'vals': vals})
+                except ValueError as e:
+                    errors.append({'row': number, 'identifier': self._cell(row.get(key) or row.get('email')), 'message': str(e)})
+
+            existing = rec._existing_duplicates(key, rows)
+            valid = []
+            for row in rows:
+                reason = existing.get(('email', row['vals']['email'])) or existing.get((key, row['vals'][key]))
+                if reason:
+                    errors.append({'row': row['row'], 'identifier': row['vals'][key], 'message': reason})
+                else:
+                    valid.append(row)
+            errors.sort(key=lambda error: error['row'])
+            rec.write({
+                'rows': valid,
+                'next_row': 0,
+                'total_count': total,
+                'valid_count': len(valid),
+                'imported_count': 0,
+                'last_error': False,
+                'state': 'validated',
+                'error_ids': [Command.clear()] + [Command.create(error) for error in errors],
+            })
+
+    def _existing_duplicates(self, key, rows):
+        """``{(column, value): message}`` for the rows clashing with records already in the database."""
+        emails = [row['vals']['email'] for row in rows]
+        keys = [row['vals'][key] for row in rows]
+        existing = {}
+        if key == 'matric_number':
+            Member = self.env['patient.demographic.student'].with_context(active_test=False)
+        else:
+            Member = self.env['patient.demographic.staff'].with_context(active_test=False)
+        for member in Member.search_read([(key, 'in', keys)], [key]):
+            existing[key, member[key]] = _("%s already exists.") % Member._fields[key].string
+        # Incoming emails are lowercased but stored ones may not be, so match on lower() in SQL
+        self.env['res.users'].flush_model(['login'])
+        self.env['res.partner'].flush_model(['email'])
+        self.env['patient.demographic'].flush_model(['partner_id'])
+        self.env.cr.execute("""
+            SELECT login FROM res_users WHERE lower(login) = ANY(%s)
+             UNION
+            SELECT p.email
+              FROM patient_demographic d
+              JOIN res_partner p ON p.id = d.partner_id
+             WHERE lower(p.email) = ANY(%s)
+        """, [emails, emails])
+        for email, in self.env.cr.fetchall():
+            existing['email', email.lower()] = _("A patient or user with email %s already exists.") % email
+        return existing
+
+    def action_start(self):
+        for rec in self:
+            if rec.state not in ('validated', 'failed'):
+                raise models.UserError(_("Validate the file before importing it."))
+        self.write({'state': 'running', 'last_error': False})
+        self.env.ref('patient.ir_cron_patient_import')._trigger()
+
+    def action_reset(self):
+        self.filtered(lambda rec: rec.state in ('validated', 'failed') and not rec.imported_count).write({'state': 'draft'})
+
+    def _import_chunk(self, chunk):
+        """Create one chunk of patients in a single batch, falling back to row by row if it fails.
+
+        Returns the number of patients created and the errors of the rows
+        that could not be imported.
+        """
+        Patient = self.env['patient.record'].with_context(tracking_disable=True, mail_create_nolog=True, mail_notrack=True)
+        # create() fills ids into the dicts it gets, so each attempt works on fresh copies
+        try:
+            with self.env.cr.savepoint():
+                Patient.create([dict(row['vals']) for row in chunk])
+            return len(chunk), []
+        except Exception:
+            _logger.info("Import %s: batch of %s failed, retrying row by row", self.id, len(chunk), exc_info=True)
+        created, errors = 0, []
+        key = MEMBER_COLUMNS[self.member_type][0]
+        for row in chunk:
+            try:
+                with self.env.cr.savepoint():
+                    Patient.create(dict(row['vals']))
+                created += 1
+            except Exception as e:
+                errors.append({'row': row['row'], 'identifier': row['vals'].get(key), 'message': str(e)})
+        return created, errors
+
+    def _process(self, deadline):
+        """Import chunks from ``next_row`` until the rows or the time run out.
+
+        The position and counters are saved with every chunk in the same
+        transaction, so a run interrupted for any reason resumes right after
+        the last committed chunk.
+        """
+        self.ensure_one()
+        rows = self.rows or []
+        while self.next_row < len(rows) and time.monotonic() < deadline:
+            chunk = rows[self.next_row:self.next_row + max(self.batch_size, 1)]
+            created, errors = self._import_chunk(chunk)
+            self.write({
+                'next_row': self.next_row + len(chunk),
+                'imported_count': self.imported_count + created,
+                'error_ids': [Command.create(error) for error in errors],
+            })
+            if not modules.module.current_test:
+                self.env.cr.commit()
+        if self.next_row >= len(rows):
+            self.write({'state': 'done', 'rows': False})
+            _logger.info("Import %s finished: %s patients imported, %s errors", self.id, self.imported_count, self.error_count)
+
+    @api.model
+    def _cron_process_imports(self):
+        """Cron job running the pending patient imports, oldest first.
+
+        Stops after ``_import_time_budget`` seconds and reports progress, so
+        the cron is re-triggered until every import is done. An import that
+        fails unexpectedly is marked failed and can be resumed from its form.
+        """
+        deadline = time.monotonic() + self._import_time_budget
+        done = 0
+        for job in self.search([('state', '=', 'running')], order='create_date, id'):
+            if time.monotonic() >= deadline:
+                break
+            start = job.next_row
+            try:
+                job._process(deadline)
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception("Import %s failed", job.id)
+                job.write({'state': 'failed', 'last_error': str(e)})
+                if not modules.module.current_test:
+                    self.env.cr.commit()
+            done += job.next_row - start
+        remaining = sum(len(job.rows or []) - job.next_row for job in self.search([('state', '=', 'running')]))
+        self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
+
+
+class PatientImportError(models.Model):
+    _name = 'patient.import.error'
+    _description = 'Patient Import Error'
+    _order = 'row'
+
+    import_id = fields.Many2one('patient.import', required=True, ondelete='cascade', index=True)
+    row = fields.Integer(readonly=True)
+    identifier = fields.Char(readonly=True)
+    message = fields.Char(readonly=True)
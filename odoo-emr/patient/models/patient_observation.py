@@ -0,0 +1,48 @@
+from odoo import models, api
+from odoo.tools import SQL
+
+VITAL_FIELDS = ['blood_pressure', 'respiratory_rate', 'spo2', 'heart_rate', 'temperature']
+BIOMETRIC_FIELDS = ['weight', 'height']
+
+
+class PatientObservation(models.AbstractModel):
+    _name = 'patient.observation'
+    _description = 'Latest Patient Observations'
+
+    @api.model
+    def latest(self, model_name, patient_ids, fnames):
+        """Newest row of ``model_name`` for each patient, as ``{patient_id: {field: value}}``.
+
+        One ``DISTINCT ON (patient_id)`` query serves the whole set of
+        patients; rows are ranked by ``recorded_at`` then ``id``, and archived
+        rows are ignored on models that can be archived.
+        """
+        patient_ids = [pid for pid in patient_ids if pid]
+        if not patient_ids:
+            return {}
+        Model = self.env[model_name]
+        Model.check_access('read')
+        conditions = [SQL("patient_id = ANY(%s)", patient_ids)]
+        if 'active' in Model._fields:
+            conditions.append(SQL("active"))
+        Model.flush_model(['patient_id', 'recorded_at', 'active', *fnames] if 'active' in Model._fields
+                          else ['patient_id', 'recorded_at', *fnames])
+        self.env.cr.execute(SQL(
+            "SELECT DISTINCT ON (patient_id) patient_id, %s FROM %s WHERE %s"
+            " ORDER BY patient_id, recorded_at DESC NULLS LAST, id DESC",
+            SQL(", ").join(SQL.identifier(fname) for fname in fnames),
+            SQL.identifier(Model._table),
+            SQL(" AND ").join(conditions),
+        ))
+        return {row.pop('patient_id'): row for row in self.env.cr.dictfetchall()}
+
+    @api.model
+    def latest_vitals(self, patient_ids):
+        """Latest vital signs and biometrics of each patient, with ``False`` where none was recorded."""
+        vitals = self.latest('patient.vitals', patient_ids, VITAL_FIELDS)
+        biometrics = self.latest('patient.biometrics', patient_ids, BIOMETRIC_FIELDS)
+        result = {}
+        for pid in patient_ids:
+            values = {**vitals.get(pid, {}), **biometrics.get(pid, {})}
+            result[pid] = {fname: values.get(fname) or False for fname in VITAL_FIELDS + BIOMETRIC_FIELDS}
+        return result
@@ -1,6 +1,13 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, modules, _
 import random
 import logging
+from .patient_observation import VITAL_FIELDS, BIOMETRIC_FIELDS
+from .patient_timeseries import SERIES_METRICS
+_logger = logging.getLogger(__name__)
+
+# Observation fields that feed the snapshot; a change to any of them on a patient's rows refreshes it
+SNAPSHOT_VITAL_FIELDS = VITAL_FIELDS + ['systolic_bp', 'diastolic_bp', 'recorded_at']
+SNAPSHOT_BIOMETRIC_FIELDS = BIOMETRIC_FIELDS + ['recorded_at']
 
 
 class PatientRecord(models.Model):
@@ -16,13 +23,17 @@ class PatientRecord(models.Model):
     form_ids = fields.One2many('patient.form', 'patient_id', string="Forms", help="Forms associated with this patient", tracking=True)
     demographic_id = fields.Many2one('patient.demographic', string="Patient Demographic", ondelete="restrict")
     vitals_ids = fields.One2many('patient.vitals', 'patient_id', string="Vitals Records",tracking=True)
-    blood_pressure = fields.Char(string="BP (mmHg)", compute="_compute_vitals")
-    respiratory_rate = fields.Integer(string="R.Rate (breaths/min)", compute="_compute_vitals")
-    spo2 = fields.Float(string="SpO₂(%)", compute="_compute_vitals")
-    heart_rate = fields.Integer(string="H.Rate (bpm)", compute="_compute_vitals")
-    temperature = fields.Float(string="Temperature (°C)", compute="_compute_vitals")
-    weight = fields.Float(string="Weight (kg)", compute="_compute_vitals")
-    height = fields.Integer(string="Height (cm)", compute="_compute_vitals")
+    # Snapshot of the latest vitals and biometrics, stored so clinical filters are plain indexed queries
+    blood_pressure = fields.Char(string="BP (mmHg)", compute="_compute_vitals", store=True)
+    systolic_bp = fields.Integer(string="Systolic BP", compute="_compute_vitals", store=True, index=True)
+    diastolic_bp = fields.Integer(string="Diastolic BP", compute="_compute_vitals", store=True)
+    respiratory_rate = fields.Integer(string="R.Rate (breaths/min)", compute="_compute_vitals", store=True)
+    spo2 = fields.Float(string="SpO₂(%)", compute="_compute_vitals", store=True, index=True)
+    heart_rate = fields.Integer(string="H.Rate (bpm)", compute="_compute_vitals", store=True, index=True)
+    temperature = fields.Float(string="Temperature (°C)", compute="_compute_vitals", store=True, index=True)
+    vitals_recorded_at = fields.Datetime(string="Vitals Recorded At", compute="_compute_vitals", store=True, index=True)
+    weight = fields.Float(string="Weight (kg)", compute="_compute_vitals", store=True)
+    height = fields.Integer(string="Height (cm)", compute="_compute_vitals", store=True)
     biometrics_ids = fields.One2many('patient.biometrics', 'patient_id', string="Biometric Records", tracking=True)
     conditions_ids = fields.One2many('patient.conditions', 'patient_id', string="Medical Conditions", tracking=True)
     name = fields.Char(string="Name", related="demographic_id.name", store=True, index=True)
@@ -41,22 +52,29 @@ class PatientRecord(models.Model):
 ]
 
 
-    @api.model
-    def create(self, vals):
-        if vals.get('patient_id', 'New') == 'New':
-            vals['patient_id'] = self.env['ir.sequence'].next_by_code('patient.record') or _('New')
-        record = super(PatientRecord, self).create(vals)
-        if not record.user_id and record.demographic_id and record.demographic_id.partner_id:
-            user_vals = {
-                'name': record.name,
-                'login': record.demographic_id.email,
-                'partner_id': record.demographic_id.partner_id.id,
-                'groups_id': [(6, 0, [self.env.ref('emr_config.group_emr_patient').id])]
-            }
-            record.user_id = self.env['res.users'].create(user_vals)
-        if record.image_1920:
+    @api.model_create_multi
+    def create(self, vals_list):
+        new = [vals for vals in vals_list if vals.get('patient_id', 'New') == 'New']
+        for vals, number in zip(new, self.env['ir.sequence'].next_batch_by_code('patient.record', len(new))):
+            vals['patient_id'] = number or _('New')
+        # Portal users are created up front in one batch, from the demographic partner of each record
+        without_user = [vals for vals in vals_list if not vals.get('user_id') and vals.get('demographic_id')]
+        demographics = self.env['patient.demographic'].browse([vals['demographic_id'] for vals in without_user])
+        with_partner = [(vals, demographic) for vals, demographic in zip(without_user, demographics) if demographic.partner_id]
+        if with_partner:
+            group_id = self.env.ref('emr_config.group_emr_patient').id
+            users = self.env['res.users'].create([{
+                'name': demographic.name,
+                'login': demographic.email,
+                'partner_id': demographic.partner_id.id,
+                'groups_id': [(6, 0, [group_id])],
+            } for _vals, demographic in with_partner])
+            for (vals, _demographic), user in zip(with_partner, users):
+                vals['user_id'] = user.id
+        records = super(PatientRecord, self).create(vals_list)
+        for record in records.filtered('image_1920'):
             record.demographic_id.partner_id.image_1920 = record.image_1920
-        return record
+        return records
     def write(self, vals):
 
         res = super(PatientRecord, self).write(vals)
@@ -70,11 +88,11 @@ class PatientRecord(models.Model):
         return {
             'type': 'ir.actions.act_window',
             'name': 'Vitals Trend',
-            'res_model': 'patient.vitals',
+            'res_model': 'patient.vitals.rollup',
             'view_mode': 'graph',
-            'views': [(False, 'graph')],
-            'domain': [('patient_id', '=', self.id)],
-            'context': {'search_default_group_by_recorded_at': 1},
+            'views': [(self.env.ref('patient.view_patient_vitals_rollup_graph').id, 'graph')],
+            # Daily rollups keep the chart readable however many raw observations there are
+            'domain': [('patient_id', '=', self.id), ('bucket', '=', 'day'), ('metric', 'in', SERIES_METRICS['patient.vitals'])],
             'target': 'new',
         }
 
@@ -83,26 +101,47 @@ class PatientRecord(models.Model):
         return {
             'type': 'ir.actions.act_window',
             'name': 'Biometrics Trend',
-            'res_model': 'patient.biometrics',
+            'res_model': 'patient.vitals.rollup',
             'view_mode': 'graph',
-            'views': [(False, 'graph')],
-            'domain': [('patient_id', '=', self.id)],
-            'context': {'search_default_group_by_recorded_at': 1},
+            'views': [(self.env.ref('patient.view_patient_vitals_rollup_graph').id, 'graph')],
+            # Daily rollups keep the chart readable however many raw observations there are
+            'domain': [('patient_id', '=', self.id), ('bucket', '=', 'day'), ('metric', 'in', SERIES_METRICS['patient.biometrics'])],
             'target': 'new',
         }
     
-    @api.depends('vitals_ids','biometrics_ids')
+    @api.depends(*[f'vitals_ids.{fname}' for fname in SNAPSHOT_VITAL_FIELDS],
+                 *[f'biometrics_ids.{fname}' for fname in SNAPSHOT_BIOMETRIC_FIELDS])
     def _compute_vitals(self):
-        latest_vital = self.env['patient.vitals'].search([('patient_id', '=', self.id)],order="recorded_at desc",limit=1)
-        latest_biometric = self.env['patient.biometrics'].search([('patient_id', '=', self.id)],order="recorded_at desc",limit=1)
+        # Only patients whose observations changed are recomputed, in one batch per flush
+        Observation = self.env['patient.observation']
+        vitals = Observation.latest('patient.vitals', self._origin.ids, SNAPSHOT_VITAL_FIELDS)
+        biometrics = Observation.latest('patient.biometrics', self._origin.ids, BIOMETRIC_FIELDS)
         for rec in self:
-            rec.blood_pressure = latest_vital.blood_pressure
-            rec.respiratory_rate = latest_vital.respiratory_rate
-            rec.spo2 = latest_vital.spo2
-            rec.heart_rate = latest_vital.heart_rate
-            rec.temperature = latest_vital.temperature
-            rec.weight = latest_biometric.weight
-            rec.height = latest_biometric.height
+            vital = vitals.get(rec._origin.id, {})
+            biometric = biometrics.get(rec._origin.id, {})
+            rec.update({fname: vital.get(fname) or False for fname in VITAL_FIELDS + ['systolic_bp', 'diastolic_bp']})
+            rec.update({fname: biometric.get(fname) or False for fname in BIOMETRIC_FIELDS})
+            rec.vitals_recorded_at = vital.get('recorded_at') or False
+
+    @api.model
+    def _backfill_vitals_snapshot(self, batch_size=1000):
+        """Recompute the stored vitals snapshot of every patient, committing each batch.
+
+        Run once after importing observations with SQL, e.g. from ``odoo-bin shell``:
+        ``env['patient.record']._backfill_vitals_snapshot()``.
+        """
+        snapshot = [self._fields[fname] for fname in VITAL_FIELDS + BIOMETRIC_FIELDS + ['systolic_bp', 'diastolic_bp', 'vitals_recorded_at']]
+        ids = self.with_context(active_test=False).search([], order='id').ids
+        for start in range(0, len(ids), batch_size):
+            batch = self.browse(ids[start:start + batch_size])
+            for field in snapshot:
+                self.env.add_to_compute(field, batch)
+            self.env.flush_all()
+            if not modules.module.current_test:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        _logger.info("Recomputed the vitals snapshot of %s patients", len(ids))
+        return len(ids)
 
 
 class PatientRecordDemographic(models.Model):
@@ -149,42 +188,49 @@ class PatientRecordDemographic(models.Model):
     country_id = fields.Many2one('res.country',related='demographic_id.partner_id.country_id',readonly=False,string='Country')
 
 
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         demographic_fields = [
             'first_name', 'last_name', 'email', 'phone', 'gender', 'date_of_birth',
             'marital_status', 'other_name', 'next_of_kin_name', 'next_of_kin_relationship',
             'next_of_kin_phone'
         ]
-        demographic_vals = {field: vals.get(field) for field in demographic_fields if vals.get(field)}
-        demographic_vals['name'] = f"{vals.get('first_name', '')} {vals.get('last_name', '')}".strip() or 'Unnamed'
-        student_demographic = staff_demographic = None
+        demographic_vals_list = []
+        for vals in vals_list:
+            demographic_vals = {field: vals.get(field) for field in demographic_fields if vals.get(field)}
+            demographic_vals['name'] = f"{vals.get('first_name', '')} {vals.get('last_name', '')}".strip() or 'Unnamed'
+            demographic_vals_list.append(demographic_vals)
 
         try:
-            if 'member_type' in vals and vals.get('member_type') == 'student':
-                student_vals = {
-                    'matric_number': vals.get('matric_number'),
-                    'department_id': vals.get('department_id'),
-                    'faculty_id': vals.get('faculty_id'),
-                    'level': vals.get('level')
-                }
-                student_demographic = self.env['patient.demographic.student'].create(student_vals)
+            # Each layer is created in one batch for the whole vals_list
+            students = [(vals, demographic_vals) for vals, demographic_vals in zip(vals_list, demographic_vals_list)
+                        if vals.get('member_type') == 'student']
+            student_demographics = self.env['patient.demographic.student'].create([{
+                'matric_number': vals.get('matric_number'),
+                'department_id': vals.get('department_id'),
+                'faculty_id': vals.get('faculty_id'),
+                'level': vals.get('level')
+            } for vals, _demographic_vals in students])
+            for (_vals, demographic_vals), student_demographic in zip(students, student_demographics):
                 demographic_vals['student_demographic_id'] = student_demographic.id
 
-            elif 'member_type' in vals and vals.get('member_type') == 'staff':
-                staff_vals = {
-                    'staff_number': vals.get('staff_number'),
-                    'employment_type': vals.get('employment_type'),
-                    'designation': vals.get('designation')
-                }
-                staff_demographic = self.env['patient.demographic.staff'].create(staff_vals)
+            staff = [(vals, demographic_vals) for vals, demographic_vals in zip(vals_list, demographic_vals_list)
+                     if vals.get('member_type') == 'staff']
+            staff_demographics = self.env['patient.demographic.staff'].create([{
+                'staff_number': vals.get('staff_number'),
+                'employment_type': vals.get('employment_type'),
+                'designation': vals.get('designation')
+            } for vals, _demographic_vals in staff])
+            for (_vals, demographic_vals), staff_demographic in zip(staff, staff_demographics):
                 demographic_vals['staff_demographic_id'] = staff_demographic.id
-            demographic = self.env['patient.demographic'].create(demographic_vals)
-            vals['demographic_id'] = demographic.id
-            record = super(PatientRecordDemographic, self).create(vals)
+
+            demographics = self.env['patient.demographic'].create(demographic_vals_list)
+            for vals, demographic in zip(vals_list, demographics):
+                vals['demographic_id'] = demographic.id
+            records = super(PatientRecordDemographic, self).create(vals_list)
         except Exception as e:
             raise models.ValidationError(_("Failed to create patient demographic: %s") % str(e))
-        return record
+        return records
     
     @api.onchange('first_name', 'last_name')
     def _onchange_name(self):
@@ -0,0 +1,232 @@
+from odoo import models, fields, api, _
+from odoo.tools import SQL
+from odoo.tools.sql import table_exists
+import logging
+_logger = logging.getLogger(__name__)
+
+# Numeric observation columns tracked as time series, per source model
+SERIES_METRICS = {
+    'patient.vitals': ['systolic_bp', 'diastolic_bp', 'heart_rate', 'respiratory_rate', 'temperature', 'spo2'],
+    'patient.biometrics': ['weight', 'height', 'bmi'],
+}
+METRIC_SOURCE = {metric: model for model, metrics in SERIES_METRICS.items() for metric in metrics}
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of ``(x, y, *extra)`` tuples sorted by ``x``.
+
+    Keeps the first and last points and, from each of ``threshold - 2`` equal
+    buckets in between, the point forming the largest triangle with the point
+    kept before it and the average of the next bucket, which preserves peaks
+    and troughs far better than averaging.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+    xs = [point[0].timestamp() for point in points]
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, len(points))
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(point[1] for point in points[next_start:next_end]) / (next_end - next_start)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (points[j][1] - points[a][1]) - (xs[a] - xs[j]) * (avg_y - points[a][1]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+class PatientTimeseriesMixin(models.AbstractModel):
+    _name = 'patient.timeseries.mixin'
+    _description = 'Observation Rollup Maintenance'
+
+    # Fields whose change moves a row between buckets or changes a rolled-up value
+    _rollup_trigger_fields = {'patient_id', 'recorded_at'}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        Rollup = self.env['patient.vitals.rollup']
+        Rollup._refresh(self._name, Rollup._touched_days(records))
+        return records
+
+    def write(self, vals):
+        if not self._rollup_trigger_fields & vals.keys():
+            return super().write(vals)
+        Rollup = self.env['patient.vitals.rollup']
+        touched = Rollup._touched_days(self)
+        res = super().write(vals)
+        Rollup._refresh(self._name, touched | Rollup._touched_days(self))
+        return res
+
+    def unlink(self):
+        Rollup = self.env['patient.vitals.rollup']
+        touched = Rollup._touched_days(self)
+        res = super().unlink()
+        Rollup._refresh(self._name, touched)
+        return res
+
+
+class PatientVitalsRollup(models.Model):
+    _name = 'patient.vitals.rollup'
+    _description = 'Hourly and Daily Observation Rollups'
+    _order = 'bucket_start'
+    _log_access = False
+
+    patient_id = fields.Many2one('patient.record', string="Patient", required=True, ondelete='cascade', readonly=True)
+    metric = fields.Selection([
+        ('systolic_bp', 'Systolic BP'),
+        ('diastolic_bp', 'Diastolic BP'),
+        ('heart_rate', 'Heart Rate'),
+        ('respiratory_rate', 'Respiratory Rate'),
+        ('temperature', 'Temperature'),
+        ('spo2', 'SpO₂'),
+        ('weight', 'Weight'),
+        ('height', 'Height'),
+        ('bmi', 'BMI'),
+    ], required=True, readonly=True)
+    bucket = fields.Selection([('hour', 'Hour'), ('day', 'Day')], required=True, readonly=True)
+    bucket_start = fields.Datetime(required=True, readonly=True)
+    sample_count = fields.Integer(readonly=True)
+    min_value = fields.Float(string="Min", readonly=True, aggregator='min')
+    max_value = fields.Float(string="Max", readonly=True, aggregator='max')
+    avg_value = fields.Float(string="Average", readonly=True, aggregator='avg')
+
+    _sql_constraints = [
+        ('unique_bucket', 'unique(patient_id, metric, bucket, bucket_start)', 'Only one rollup per patient, metric and bucket.'),
+    ]
+
+    # Windows with more raw samples than this are served from rollups instead of raw rows
+    _raw_series_limit = 20000
+
+    def init(self):
+        # Backfill once when the rollups are introduced on a database that already has observations
+        self.env.cr.execute("SELECT 1 FROM patient_vitals_rollup LIMIT 1")
+        if not self.env.cr.fetchone():
+            for model_name in SERIES_METRICS:
+                if table_exists(self.env.cr, self.env[model_name]._table):
+                    self._refresh(model_name)
+
+    def _rollup_query(self, model_name, touched=None):
+        Model = self.env[model_name]
+        metrics = SERIES_METRICS[model_name]
+        # Integer observations default to 0 when not taken, so zero is treated as missing
+        values = SQL(", ").join(
+            SQL("(%s, NULLIF(o.%s, 0)::float)", metric, SQL.identifier(metric)) for metric in metrics
+        )
+        conditions = [SQL("m.value IS NOT NULL"), SQL("o.recorded_at IS NOT NULL")]
+        if 'active' in Model._fields:
+            conditions.append(SQL("o.active"))
+        join = SQL("")
+        if touched is not None:
+            join = SQL("""JOIN unnest(%s::int[], %s::timestamp[]) AS t(patient_id, day)
+                            ON o.patient_id = t.patient_id
+                           AND o.recorded_at >= t.day AND o.recorded_at < t.day + interval '1 day'""",
+                       [pid for pid, _day in touched], [day for _pid, day in touched])
+        return SQL("""
+            INSERT INTO patient_vitals_rollup (patient_id, metric, bucket, bucket_start, sample_count, min_value, max_value, avg_value)
+            SELECT o.patient_id, m.metric, b.bucket, date_trunc(b.bucket, o.recorded_at),
+                   count(*), min(m.value), max(m.value), avg(m.value)
+              FROM %(table)s o
+              %(join)s
+        CROSS JOIN (VALUES ('hour'), ('day')) AS b(bucket)
+        CROSS JOIN LATERAL (VALUES %(values)s) AS m(metric, value)
+             WHERE %(where)s
+          GROUP BY o.patient_id, m.metric, b.bucket, date_trunc(b.bucket, o.recorded_at)
+       ON CONFLICT (patient_id, metric, bucket, bucket_start) DO UPDATE
+              SET sample_count = EXCLUDED.sample_count, min_value = EXCLUDED.min_value,
+                  max_value = EXCLUDED.max_value, avg_value = EXCLUDED.avg_value
+        """, table=SQL.identifier(Model._table), join=join, values=values, where=SQL(" AND ").join(conditions))
+
+    @api.model
+    def _refresh(self, model_name, touched=None):
+        """Rebuild the rollups of ``model_name``'s metrics for the given ``(patient_id, day)`` pairs.
+
+        Every hour and day bucket of a touched day is recomputed from the raw
+        rows, so inserts, edits, archiving and deletes are all reflected.
+        Without ``touched`` all rollups of the model are rebuilt.
+
+        Buckets are upserted: when a concurrent transaction rebuilt the same
+        buckets first, PostgreSQL reports a serialization failure, which Odoo
+        retries, instead of a ``unique_bucket`` violation, which it does not.
+        """
+        if touched is not None:
+            touched = {(pid, fields.Datetime.to_datetime(day)) for pid, day in touched if pid and day}
+            if not touched:
+                return
+        self.env[model_name].flush_model()
+        metrics = SERIES_METRICS[model_name]
+        if touched is None:
+            self.env.cr.execute("DELETE FROM patient_vitals_rollup WHERE metric = ANY(%s)", [metrics])
+        else:
+            self.env.cr.execute("""
+                DELETE FROM patient_vitals_rollup r
+                 USING unnest(%s::int[], %s::timestamp[]) AS t(patient_id, day)
+                 WHERE r.patient_id = t.patient_id AND r.metric = ANY(%s)
+                   AND r.bucket_start >= t.day AND r.bucket_start < t.day + interval '1 day'
+            """, [[pid for pid, _day in touched], [day for _pid, day in touched], metrics])
+        self.env.cr.execute(self._rollup_query(model_name, touched))
+        self.invalidate_model()
+
+    @api.model
+    def _touched_days(self, records):
+        return {(rec.patient_id.id, rec.recorded_at.replace(hour=0, minute=0, second=0, microsecond=0))
+                for rec in records if rec.patient_id and rec.recorded_at}
+
+    @api.model
+    def get_series(self, patient_id, metric, date_from=None, date_to=None, points=200):
+        """Downsampled time series of one metric for one patient.
+
+        Returns ``{"metric", "resolution", "points"}`` where each point has an
+        ISO timestamp ``t`` and value ``v``. Windows of up to ``points`` samples
+        are returned raw; larger ones are reduced with LTTB, read from hourly
+        or daily rollups (which add ``min``/``max`` per point) when the raw
+        window exceeds ``_raw_series_limit`` samples.
+        """
+        if metric not in METRIC_SOURCE:
+            raise models.ValidationError(_("Unknown metric %s.") % metric)
+        self.env['patient.record'].browse(patient_id).check_access('read')
+        Model = self.env[METRIC_SOURCE[metric]]
+        date_from = fields.Datetime.to_datetime(date_from) if date_from else fields.Datetime.to_datetime('1970-01-01')
+        date_to = fields.Datetime.to_datetime(date_to) if date_to else fields.Datetime.now()
+        points = max(3, min(int(points), 5000))
+        Model.flush_model()
+
+        raw_conditions = SQL(
+            "patient_id = %s AND recorded_at >= %s AND recorded_at <= %s AND NULLIF(%s, 0) IS NOT NULL%s",
+            patient_id, date_from, date_to, SQL.identifier(metric),
+            SQL(" AND active") if 'active' in Model._fields else SQL(""),
+        )
+        self.env.cr.execute(SQL("SELECT count(*) FROM %s WHERE %s", SQL.identifier(Model._table), raw_conditions))
+        raw_count = self.env.cr.fetchone()[0]
+
+        if raw_count <= self._raw_series_limit:
+            resolution = 'raw'
+            self.env.cr.execute(SQL("SELECT recorded_at, %s::float FROM %s WHERE %s ORDER BY recorded_at",
+                                    SQL.identifier(metric), SQL.identifier(Model._table), raw_conditions))
+        else:
+            hours = (date_to - date_from).total_seconds() / 3600
+            resolution = 'hour' if hours <= self._raw_series_limit else 'day'
+            self.flush_model()
+            self.env.cr.execute("""
+                SELECT bucket_start, avg_value, min_value, max_value
+                  FROM patient_vitals_rollup
+                 WHERE patient_id = %s AND metric = %s AND bucket = %s
+                   AND bucket_start >= date_trunc(%s, %s::timestamp) AND bucket_start <= %s
+              ORDER BY bucket_start
+            """, [patient_id, metric, resolution, resolution, date_from, date_to])
+        series = lttb(self.env.cr.fetchall(), points)
+
+        def point(row):
+            value = {"t": fields.Datetime.to_string(row[0]), "v": round(row[1], 2)}
+            if len(row) > 2:
+                value.update(min=round(row[2], 2), max=round(row[3], 2))
+            return value
+
+        return {"metric": metric, "resolution": resolution, "points": [point(row) for row in series]}
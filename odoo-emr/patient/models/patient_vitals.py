@@ -1,10 +1,14 @@
 from odoo import models, fields, api, _
 import re
 
+BP_PATTERN = re.compile(r'\s*(\d+)\s*/\s*(\d+)\s*')
+
 
 class PatientVitals(models.Model):
     _name = 'patient.vitals'
     _description = 'Patient Vitals Information'
+    _inherit = ['patient.timeseries.mixin']
+    _rollup_trigger_fields = {'patient_id', 'recorded_at', 'active', 'blood_pressure', 'heart_rate', 'respiratory_rate', 'temperature', 'spo2'}
 
     patient_id = fields.Many2one('patient.record', string="Patient", required=True)
     blood_pressure = fields.Char(string="Blood Pressure (mmHg)", help="Systolic/Diastolic format, e.g., 120/80", tracking=True)
@@ -18,6 +22,16 @@ class PatientVitals(models.Model):
     spo2 = fields.Float(string="SpO₂ (%)", help="Oxygen saturation percentage")
     active = fields.Boolean(string="Active", default=True)
 
+    # Upper bound on readings accepted by one ingest() call
+    _ingest_max_rows = 10000
+
+    def init(self):
+        # Matches the DISTINCT ON ordering of patient.observation, so the latest row per patient is an index lookup
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS patient_vitals_latest_idx
+                ON patient_vitals (patient_id, recorded_at DESC NULLS LAST, id DESC)
+             WHERE active
+        """)
 
     @api.constrains('temperature', 'spo2', 'heart_rate', 'respiratory_rate', 'blood_pressure')
     def _check_vital_signs(self):
@@ -35,7 +49,7 @@ class PatientVitals(models.Model):
                 raise models.ValidationError(_("Respiratory rate must be a positive number."))
 
             if rec.blood_pressure:
-                match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', rec.blood_pressure)
+                match = BP_PATTERN.fullmatch(rec.blood_pressure)
                 if not match:
                     raise models.ValidationError(_("Blood Pressure must be in the format '120/80' with integers."))
     
@@ -43,7 +57,7 @@ class PatientVitals(models.Model):
     def _compute_blood_pressure(self):
         for record in self:
             if record.blood_pressure:
-                match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', record.blood_pressure)
+                match = BP_PATTERN.fullmatch(record.blood_pressure)
                 if match:
                     record.systolic_bp = int(match.group(1))
                     record.diastolic_bp = int(match.group(2))
@@ -61,3 +75,97 @@ class PatientVitals(models.Model):
                 rec.recorded_label = rec.recorded_at.strftime('%B %d, %Y %I:%M %p')
             else:
                 rec.recorded_label = _('Not Recorded')
+
+    @api.model
+    def ingest(self, readings):
+        """Validate and insert a batch of device readings in one go.
+
+        Each reading is a dict with ``patient_id`` (record id) or
+        ``patient_identifier`` (the patient's identifier), ``recorded_at`` and
+        any of the vital sign fields; numbers may be given as strings, as they
+        come from CSV. Patients are resolved with one query for the whole
+        batch, rows failing the same checks as ``_check_vital_signs`` are
+        reported instead of aborting the batch, and the valid ones are
+        inserted with a single ``create``.
+
+        Returns ``{"created", "ids", "errors"}`` where each error is
+        ``{"row": index in readings, "message"}``.
+        """
+        if len(readings) > self._ingest_max_rows:
+            raise models.ValidationError(_("At most %s readings can be ingested per call.") % self._ingest_max_rows)
+        Patient = self.env['patient.record']
+        identifiers = {str(r['patient_identifier']).strip() for r in readings
+                       if isinstance(r, dict) and r.get('patient_identifier')}
+        by_identifier = {row['patient_id']: row['id']
+                         for row in Patient.search_read([('patient_id', 'in', list(identifiers))], ['patient_id'])} if identifiers else {}
+        ids = set()
+        for r in readings:
+            if isinstance(r, dict) and r.get('patient_id'):
+                try:
+                    ids.add(int(r['patient_id']))
+                except (TypeError, ValueError):
+                    pass
+        known = set(Patient.browse(ids).exists().ids) | set(by_identifier.values())
+
+        vals_list, errors = [], []
+        for index, reading in enumerate(readings):
+            try:
+                vals_list.append(self._ingest_values(reading, by_identifier, known))
+            except (ValueError, TypeError) as e:
+                errors.append({"row": index, "message": str(e)})
+        records = self.with_context(tracking_disable=True).create(vals_list)
+        return {"created": len(records), "ids": records.ids, "errors": errors}
+
+    @api.model
+    def _ingest_values(self, reading, by_identifier, known):
+        if not isinstance(reading, dict):
+            raise ValueError(_("Reading must be an object."))
+
+        def number(fname, cast):
+            value = reading.get(fname)
+            if value in (None, ''):
+                return None
+            try:
+                return cast(value)
+            except (TypeError, ValueError):
+                raise ValueError(_("%s must be a number.") % fname)
+
+        if reading.get('patient_identifier'):
+            patient_id = by_identifier.get(str(reading['patient_identifier']).strip())
+        else:
+            patient_id = number('patient_id', int)
+        if not patient_id or patient_id not in known:
+            raise ValueError(_("Unknown patient."))
+
+        vals = {'patient_id': patient_id}
+        if reading.get('recorded_at'):
+            try:
+                vals['recorded_at'] = fields.Datetime.to_datetime(reading['recorded_at'])
+            except ValueError:
+                raise ValueError(_("recorded_at must be a 'YYYY-MM-DD HH:MM:SS' UTC datetime."))
+
+        temperature = number('temperature', float)
+        if temperature and not (25 <= temperature <= 45):
+            raise ValueError(_("Temperature must be between 25°C and 45°C."))
+        spo2 = number('spo2', float)
+        if spo2 and not (0 <= spo2 <= 100):
+            raise ValueError(_("SpO₂ must be between 0% and 100%."))
+        heart_rate = number('heart_rate', int)
+        if heart_rate is not None and heart_rate < 0:
+            raise ValueError(_("Heart rate must be a positive number."))
+        respiratory_rate = number('respiratory_rate', int)
+        if respiratory_rate is not None and respiratory_rate < 0:
+            raise ValueError(_("Respiratory rate must be a positive number."))
+        blood_pressure = reading.get('blood_pressure') or None
+        if blood_pressure and not BP_PATTERN.fullmatch(str(blood_pressure)):
+            raise ValueError(_("Blood Pressure must be in the format '120/80' with integers."))
+
+        measured = {
+            'temperature': temperature, 'spo2': spo2, 'heart_rate': heart_rate,
+            'respiratory_rate': respiratory_rate, 'blood_pressure': blood_pressure and str(blood_pressure).strip(),
+        }
+        measured = {fname: value for fname, value in measured.items() if value is not None}
+        if not measured:
+            raise ValueError(_("Reading has no measurement."))
+        vals.update(measured)
+        return vals
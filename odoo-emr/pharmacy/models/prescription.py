@@ -1,5 +1,6 @@
 from odoo import models, fields, api, _
 from .dummy_data import DRUG_FORMS, ROUTE_SELECTION, DRUG_UNITS, FREQUENCY_PERIOD_SELECTION
+from odoo.addons.patient.models.patient_observation import VITAL_FIELDS, BIOMETRIC_FIELDS
 from dateutil.relativedelta import relativedelta
 
 class PrescriptionOrder(models.Model):
@@ -147,16 +148,9 @@ class PrescriptionLine(models.Model):
 
     @api.depends('vitals_ids','biometrics_ids')
     def _compute_vitals(self):
-        latest_vital = self.vitals_ids.sorted(key='create_date', reverse=True)[:1]
-        latest_biometric = self.biometrics_ids.sorted(key='create_date', reverse=True)[:1]
+        latest = self.env['patient.observation'].latest_vitals(self.patient_id._origin.ids)
         for rec in self:
-            rec.blood_pressure = latest_vital.blood_pressure
-            rec.respiratory_rate = latest_vital.respiratory_rate
-            rec.spo2 = latest_vital.spo2
-            rec.heart_rate = latest_vital.heart_rate
-            rec.temperature = latest_vital.temperature
-            rec.weight = latest_biometric.weight
-            rec.height = latest_biometric.height
+            rec.update(latest.get(rec.patient_id._origin.id) or dict.fromkeys(VITAL_FIELDS + BIOMETRIC_FIELDS, False))
 
     # Add these methods to your PrescriptionOrderLine class
 
@@ -0,0 +1,78 @@
+"""Concurrency benchmark: 200 parallel bookings racing for 20 slots.
+
+Talks to Odoo directly over XML-RPC, picks the first N free granular slots and
+fires the bookings from a thread pool so many land on the same slot at once.
+Every slot must end up booked exactly once; every other attempt should get
+the "slot_unavailable" answer rather than an RPC fault.
+
+Run it against a test database only, it consumes real slots:
+
+    python test-scripts/bench_booking_race.py --url http://localhost:8069 --db emr \\
+        --user admin --password admin [--bookings 200] [--slots 20]
+"""
+import argparse
+import statistics
+import threading
+import time
+import xmlrpc.client
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+_local = threading.local()
+
+
+def proxy(url):
+    # ServerProxy is not thread-safe, so each worker thread keeps its own
+    if not hasattr(_local, "models"):
+        _local.models = xmlrpc.client.ServerProxy(f"{url}/xmlrpc/2/object", allow_none=True)
+    return _local.models
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8069")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=20)
+    opts = parser.parse_args()
+
+    uid = xmlrpc.client.ServerProxy(f"{opts.url}/xmlrpc/2/common").authenticate(opts.db, opts.user, opts.password, {})
+    models = proxy(opts.url)
+    slot_ids = models.execute_kw(opts.db, uid, opts.password, "appointment.available.slot", "search",
+                                 [[("is_booked", "=", False), ("active", "=", True)]], {"limit": opts.slots})
+    patient_ids = models.execute_kw(opts.db, uid, opts.password, "patient.record", "search", [[]], {"limit": 1})
+    if len(slot_ids) < opts.slots or not patient_ids:
+        raise SystemExit(f"Need {opts.slots} free slots and one patient, found {len(slot_ids)} and {len(patient_ids)}")
+
+    def book(i):
+        slot_id = slot_ids[i % len(slot_ids)]
+        started = time.perf_counter()
+        try:
+            result = proxy(opts.url).execute_kw(opts.db, uid, opts.password, "appointment.appointment",
+                                                "book_appointment", [slot_id, patient_ids[0], "race benchmark"])
+            outcome = "booked" if result.get("success") else result.get("code", "refused")
+        except xmlrpc.client.Fault as e:
+            outcome = f"fault: {e.faultString.splitlines()[-1][:80]}"
+        return slot_id, outcome, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=opts.bookings) as pool:
+        results = list(pool.map(book, range(opts.bookings)))
+    elapsed = time.perf_counter() - started
+
+    outcomes = Counter(outcome for _slot, outcome, _secs in results)
+    per_slot = Counter(slot for slot, outcome, _secs in results if outcome == "booked")
+    latencies = sorted(secs for _slot, _outcome, secs in results)
+    print(f"{opts.bookings} bookings on {len(slot_ids)} slots in {elapsed:.2f}s")
+    for outcome, count in outcomes.most_common():
+        print(f"  {outcome:<30} {count}")
+    print(f"latency p50={statistics.median(latencies) * 1000:.0f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms max={latencies[-1] * 1000:.0f}ms")
+    double = [slot for slot, count in per_slot.items() if count > 1]
+    print("double bookings:", double or "none", "| slots booked:", len(per_slot))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Micro-benchmark: XML-RPC vs JSON-RPC decode cost for an availability payload.
+
+Builds a response shaped like emr.provider.get_doctor_availability with 500
+slots, serializes it the way Odoo would for each protocol, then times how long
+the gateway spends turning the raw bytes back into Python objects.
+
+    python test-scripts/bench_odoo_decode.py [--slots 500] [--runs 200]
+"""
+import argparse
+import json
+import timeit
+import xmlrpc.client
+from datetime import date, datetime, timedelta
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def build_availability(n_slots):
+    start = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=8)
+    by_date = {}
+    for i in range(n_slots):
+        # 24 twenty-minute slots per day, 08:00-16:00
+        slot_start = start + timedelta(days=i // 24, minutes=20 * (i % 24))
+        by_date.setdefault(slot_start.date().isoformat(), []).append({
+            "id": 100000 + i,
+            "time": slot_start.strftime("%H:%M"),
+        })
+    return {
+        "name": "Dr Ada Okafor",
+        "about": "Consultant physician, general outpatient clinic",
+        "doctor_id": 2,
+        "clinic_type": "General Outpatient Clinic",
+        "clinic_type_slug": "general-outpatient-clinic",
+        "availability": [{"date": d, "slots": s} for d, s in by_date.items()],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slots", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=200)
+    opts = parser.parse_args()
+
+    payload = build_availability(opts.slots)
+    xml_body = xmlrpc.client.dumps((payload,), methodresponse=True, allow_none=True).encode()
+    json_body = json.dumps({"jsonrpc": "2.0", "id": 1, "result": payload}).encode()
+
+    decoders = {
+        "xmlrpc.client.loads": lambda: xmlrpc.client.loads(xml_body, use_builtin_types=True),
+        "json.loads": lambda: json.loads(json_body),
+    }
+    if orjson is not None:
+        decoders["orjson.loads"] = lambda: orjson.loads(json_body)
+
+    print(f"payload: {opts.slots} slots, xml={len(xml_body)} bytes, json={len(json_body)} bytes")
+    baseline = None
+    for name, fn in decoders.items():
+        per_call = min(timeit.repeat(fn, number=opts.runs, repeat=5)) / opts.runs
+        baseline = baseline or per_call
+        print(f"{name:<22} {per_call * 1e6:10.1f} us/decode  {baseline / per_call:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark: confirming 500 time slot blocks, per-slot loop vs batch generation.
+
+Runs inside an Odoo shell on a database with the appointment module installed:
+
+    BLOCKS=500 odoo-bin shell -d <db> --no-http < test-scripts/bench_slot_generation.py
+
+Creates BLOCKS posted 8-hour blocks for one provider on consecutive future
+days, then confirms them twice: once with the original loop (an overlap search
+and a single-record create per 20-minute step) and once with
+TimeSlot.action_confirm. Wall time and SQL query counts are reported for each;
+everything is rolled back afterwards.
+"""
+import os
+import time
+from datetime import date, timedelta
+
+BLOCKS = int(os.environ.get("BLOCKS", 500))
+
+
+def create_blocks(env, n_blocks):
+    provider = env['emr.provider'].search([('service_ids', '!=', False)], limit=1)
+    location = env['emr.locations'].search([], limit=1)
+    if not provider or not location:
+        raise SystemExit("Need at least one provider with a clinic type and one location")
+    first_day = date.today() + timedelta(days=1)
+    blocks = env['appointment.timeslot'].create([{
+        'date': first_day + timedelta(days=i),
+        'start_time': 8.0,
+        'end_time': 16.0,
+        'duration': 20,
+        'provider_id': provider.id,
+        'location_id': location.id,
+        'service_type': provider.service_ids[0].id,
+        'state': 'posted',
+    } for i in range(n_blocks)])
+    env.flush_all()
+    return blocks
+
+
+def confirm_per_slot(blocks):
+    # The pre-batching implementation of action_confirm / generate_granular_slots
+    Slot = blocks.env['appointment.available.slot']
+    for rec in blocks:
+        rec.state = 'confirmed'
+        rec.available_slot_ids.unlink()
+        start, end = rec.start_datetime, rec.end_datetime
+        while start < end:
+            slot_end = start + timedelta(minutes=rec.duration or 20)
+            if slot_end > end:
+                break
+            if not Slot.search([('slot_id', '=', rec.id), ('start_datetime', '<', slot_end), ('end_datetime', '>', start)]):
+                Slot.create({
+                    'slot_id': rec.id,
+                    'start_datetime': start,
+                    'end_datetime': slot_end,
+                    'duration': rec.duration,
+                    'provider_id': rec.provider_id.id,
+                    'location_id': rec.location_id.id,
+                    'service_type': rec.service_type.id,
+                })
+            start = slot_end
+
+
+def confirm_batch(blocks):
+    blocks.action_confirm()
+
+
+def measure(env, name, confirm):
+    blocks = create_blocks(env, BLOCKS)
+    queries = env.cr.sql_log_count
+    started = time.perf_counter()
+    confirm(blocks)
+    env.flush_all()
+    elapsed = time.perf_counter() - started
+    queries = env.cr.sql_log_count - queries
+    slots = env['appointment.available.slot'].search_count([('slot_id', 'in', blocks.ids)])
+    print(f"{name:<10} {elapsed:8.2f} s  {queries:7d} queries  {slots:6d} slots")
+    env.cr.rollback()
+    env.invalidate_all()
+    return elapsed
+
+
+print(f"confirming {BLOCKS} blocks of 8h in 20-minute slots")
+baseline = measure(env, "per-slot", confirm_per_slot)  # noqa: F821 - provided by odoo-bin shell
+batched = measure(env, "batch", confirm_batch)  # noqa: F821
+print(f"speedup    {baseline / batched:8.1f}x")
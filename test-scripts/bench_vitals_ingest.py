@@ -0,0 +1,96 @@
+"""Load benchmark: bulk vitals ingestion through the gateway at 10k readings per request.
+
+Logs in through /api/auth/staff/login as an internal Odoo user that can write
+patient.vitals (a nurse, or a device account with an API key as password),
+generates synthetic readings for the given patients (with a small share of
+deliberately invalid rows, to exercise the per-row error path) and posts them
+to /api/vitals/ingest as JSON lines or CSV. Reports latency and throughput per
+request and overall.
+
+Run it against a test database only, it inserts real rows:
+
+    python test-scripts/bench_vitals_ingest.py --url http://localhost:8000 \\
+        --login nurse@example.com --password secret --patients 1,2,3 \\
+        [--rows 10000] [--requests 5] [--format ndjson|csv] [--bad-ratio 0.01]
+"""
+import argparse
+import csv
+import io
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import orjson
+
+
+def reading(patient_id, recorded_at, bad):
+    row = {
+        "patient_id": patient_id,
+        "recorded_at": recorded_at.isoformat(),
+        "heart_rate": random.randint(55, 110),
+        "respiratory_rate": random.randint(12, 22),
+        "temperature": round(random.uniform(36.0, 38.5), 1),
+        "spo2": random.randint(92, 100),
+        "blood_pressure": f"{random.randint(100, 150)}/{random.randint(60, 95)}",
+    }
+    if bad:
+        row[random.choice(["temperature", "spo2", "blood_pressure"])] = random.choice([99, 140, "high"])
+    return row
+
+
+def encode(rows, fmt):
+    if fmt == "csv":
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        return out.getvalue().encode(), "text/csv"
+    return b"\n".join(orjson.dumps(row) for row in rows), "application/x-ndjson"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--login", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--patients", required=True, help="comma-separated patient.record ids")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--bad-ratio", type=float, default=0.01)
+    opts = parser.parse_args()
+
+    patient_ids = [int(pid) for pid in opts.patients.split(",")]
+    client = httpx.Client(base_url=opts.url, timeout=300)
+    response = client.post("/api/auth/staff/login", json={"login": opts.login, "password": opts.password})
+    response.raise_for_status()
+    token = response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    latencies, created, rejected = [], 0, 0
+    for i in range(opts.requests):
+        rows = [reading(random.choice(patient_ids), start + timedelta(seconds=30 * (i * opts.rows + n)),
+                        random.random() < opts.bad_ratio) for n in range(opts.rows)]
+        body, content_type = encode(rows, opts.format)
+        started = time.perf_counter()
+        response = client.post("/api/vitals/ingest", content=body, headers={**headers, "Content-Type": content_type})
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        result = response.json()
+        latencies.append(elapsed)
+        created += result["created"]
+        rejected += result["rejected"]
+        print(f"request {i + 1}: {len(body) / 1024:.0f} KiB, created={result['created']} rejected={result['rejected']} "
+              f"in {elapsed:.2f}s ({opts.rows / elapsed:.0f} readings/s) | {response.headers.get('server-timing')}")
+
+    total = sum(latencies)
+    print(f"{opts.requests} x {opts.rows} {opts.format} readings: created={created} rejected={rejected}")
+    print(f"latency p50={statistics.median(latencies):.2f}s max={max(latencies):.2f}s | "
+          f"throughput {opts.requests * opts.rows / total:.0f} readings/s")
+
+
+if __name__ == "__main__":
+    main()
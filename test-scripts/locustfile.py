@@ -24,3 +24,11 @@ class AuthUser(HttpUser):
     def get_doctors_availability(self):
         self.client.get("/api/doctor/general-outpatient-clinic/2/availability", headers=self.auth_headers, name="GET /api/doctor/{clinic_type}/{doctor_id}/availability")
 
+
+    @task(4)
+    def get_dashboard_batch(self):
+        self.client.post("/api/batch", headers=self.auth_headers, name="POST /api/batch", json={"calls": [
+            {"name": "doctors", "op": "doctor_list"},
+            {"name": "appointments", "op": "appointments"},
+            {"name": "availability", "op": "doctor_availability", "params": {"doctor_id": 2, "clinic_type": "general-outpatient-clinic"}},
+        ]})